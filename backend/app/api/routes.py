@@ -1,10 +1,11 @@
 """API routes for TraceMind."""
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
-from datetime import datetime, timedelta
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Response
+from datetime import timedelta
 import numpy as np
-from sklearn.decomposition import PCA
-from umap import UMAP
+import orjson
 
 from ..models import (
     MemoryInput,
@@ -17,13 +18,15 @@ from ..models import (
 from ..services.embeddings import get_embedding_service
 from ..services.chroma_client import get_chroma_service
 from ..services.compaction import get_compaction_service
+from ..services.write_buffer import get_write_buffer
 from ..utils import (
     create_metadata,
-    calculate_age_days,
-    cosine_similarity,
+    calculate_metadata_ages_days,
     to_iso_string,
     get_utc_now,
-    MergeLogger
+    MergeLogger,
+    ResponseCache,
+    SemanticCache
 )
 
 router = APIRouter()
@@ -32,22 +35,50 @@ router = APIRouter()
 embedding_service = None
 chroma_service = None
 compaction_service = None
+write_buffer = None
 merge_logger = MergeLogger()
 
+# Cached responses for read-only endpoints, cleared whenever memories change
+response_cache = ResponseCache(max_entries=256)
+recall_cache = SemanticCache(max_entries=256, similarity_threshold=0.97, ttl=60.0)
+
+# Last fitted UMAP reducer with the coordinates it produced, keyed by memory id
+_umap_cache: Dict[str, object] = {}
+_umap_lock = threading.Lock()
+
+# Embeddings are PCA-reduced to this many dimensions before UMAP
+UMAP_PCA_DIMENSIONS = 50
+
+# Projection points carry a document preview; /dashboard/point has the full text
+PROJECTION_DOCUMENT_CHARS = 100
+
+
+def invalidate_caches():
+    """Drop cached responses after memories or the merge log change."""
+    response_cache.clear()
+    recall_cache.clear()
+
 
 def init_services():
     """Initialize service instances."""
-    global embedding_service, chroma_service, compaction_service
+    global embedding_service, chroma_service, compaction_service, write_buffer
     if embedding_service is None:
         embedding_service = get_embedding_service()
         chroma_service = get_chroma_service()
         compaction_service = get_compaction_service(chroma_service, embedding_service)
+        write_buffer = get_write_buffer(chroma_service)
+        # Any write to the collection makes cached responses stale
+        chroma_service.add_change_listener(invalidate_caches)
 
 
 @router.post("/remember", response_model=MemoryResponse)
 async def remember(memory: MemoryInput):
     """Store a new memory.
     
+    While the app's write buffer is running, the memory is queued and
+    written with other recent memories in one batch shortly after the
+    response; reads flush the buffer first, so they still see it.
+    
     Args:
         memory: Memory input with text, topic, importance
         
@@ -56,9 +87,37 @@ async def remember(memory: MemoryInput):
     """
     init_services()
     
+    return await _store_memory(memory, buffered=write_buffer.running)
+
+
+@router.post("/remember/sync", response_model=MemoryResponse)
+async def remember_sync(memory: MemoryInput):
+    """Store a new memory, writing it to ChromaDB before responding.
+    
+    Args:
+        memory: Memory input with text, topic, importance
+        
+    Returns:
+        Memory ID and status
+    """
+    init_services()
+    
+    return await _store_memory(memory, buffered=False)
+
+
+async def _store_memory(memory: MemoryInput, buffered: bool) -> MemoryResponse:
+    """Embed a memory and store it directly or through the write buffer.
+    
+    Args:
+        memory: Memory input with text, topic, importance
+        buffered: Whether to queue the write instead of writing it now
+        
+    Returns:
+        Memory ID and status
+    """
     try:
         # Generate embedding
-        embedding = embedding_service.embed_single(memory.text)
+        embedding = await asyncio.to_thread(embedding_service.embed_single, memory.text)
         
         # Create metadata
         metadata = create_metadata(
@@ -68,15 +127,19 @@ async def remember(memory: MemoryInput):
         )
         
         # Store in ChromaDB
-        memory_id = chroma_service.add_memory(
-            text=memory.text,
-            embedding=embedding,
-            metadata=metadata
-        )
+        if buffered:
+            memory_id = await write_buffer.put(memory.text, embedding, metadata)
+        else:
+            memory_id = await asyncio.to_thread(
+                chroma_service.add_memory,
+                text=memory.text,
+                embedding=embedding,
+                metadata=metadata
+            )
         
         return MemoryResponse(
             id=memory_id,
-            status="stored",
+            status="queued" if buffered else "stored",
             timestamp=metadata["timestamp"]
         )
     
@@ -84,6 +147,66 @@ async def remember(memory: MemoryInput):
         raise HTTPException(status_code=500, detail=f"Error storing memory: {str(e)}")
 
 
+async def _flush_writes():
+    """Write queued memories so a read sees them.
+    
+    A failed flush keeps the memories queued for the next one, so reads
+    log the error and serve what is already stored.
+    """
+    try:
+        await write_buffer.flush()
+    except Exception as e:
+        print(f"Error flushing memory writes: {e}")
+
+
+@router.post("/remember/batch", response_model=List[MemoryResponse])
+async def remember_batch(memories: List[MemoryInput]):
+    """Store several memories with one encoder pass and one ChromaDB write.
+    
+    Args:
+        memories: Memory inputs with text, topic, importance
+        
+    Returns:
+        Memory IDs and status, in input order
+    """
+    init_services()
+    
+    if not memories:
+        return []
+    
+    try:
+        # Generate all embeddings in a single batch
+        embeddings = await asyncio.to_thread(
+            embedding_service.embed, [memory.text for memory in memories]
+        )
+        
+        # Create metadata
+        metadatas = [
+            create_metadata(
+                importance=memory.importance,
+                topic=memory.topic,
+                source=memory.source
+            )
+            for memory in memories
+        ]
+        
+        # Store in ChromaDB
+        memory_ids = await asyncio.to_thread(
+            chroma_service.add_memories,
+            [memory.text for memory in memories],
+            embeddings,
+            metadatas
+        )
+        
+        return [
+            MemoryResponse(id=memory_id, status="stored", timestamp=metadata["timestamp"])
+            for memory_id, metadata in zip(memory_ids, metadatas)
+        ]
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error storing memories: {str(e)}")
+
+
 @router.get("/recall", response_model=List[RecallResult])
 async def recall(
     q: str = Query(..., description="Query text"),
@@ -103,10 +226,17 @@ async def recall(
         List of recall results with scores
     """
     init_services()
+    await _flush_writes()
     
     try:
         # Generate query embedding
-        query_embedding = embedding_service.embed_single(q)
+        query_embedding = await asyncio.to_thread(embedding_service.embed_query, q)
+        
+        # Serve semantically equivalent recent queries from cache
+        cache_params = (k, decay, topic)
+        cached = recall_cache.get(query_embedding, cache_params)
+        if cached is not None:
+            return cached
         
         # Oversample for reranking
         k_raw = min(k * 2, 100)
@@ -118,13 +248,15 @@ async def recall(
         
         # Query ChromaDB
         if where_filter is not None:
-            results = chroma_service.query_memories(
+            results = await asyncio.to_thread(
+                chroma_service.query_memories,
                 query_embedding=query_embedding,
                 n_results=k_raw,
                 where=where_filter
             )
         else:
-            results = chroma_service.query_memories(
+            results = await asyncio.to_thread(
+                chroma_service.query_memories,
                 query_embedding=query_embedding,
                 n_results=k_raw
             )
@@ -133,44 +265,82 @@ async def recall(
             return []
         
         # Rerank with temporal decay and importance
-        scored_results = []
-        alpha = 0.7  # Weight for recency vs importance
-        decay_rate = 0.01
-        
-        for i in range(len(results["ids"][0])):
-            memory_id = results["ids"][0][i]
-            document = results["documents"][0][i]
-            metadata = results["metadatas"][0][i]
-            embedding = np.array(results["embeddings"][0][i])
-            
-            # Calculate raw similarity
-            raw_similarity = cosine_similarity(query_embedding, embedding)
-            
-            # Calculate age and recency weight
-            age_days = calculate_age_days(metadata["timestamp"])
-            recency_weight = max(0, 1 - decay_rate * age_days) if decay else 1.0
-            
-            # Calculate final score
-            importance = metadata.get("importance", 0.5)
-            final_score = raw_similarity * (alpha * recency_weight + (1 - alpha) * importance)
-            
-            scored_results.append(RecallResult(
-                id=memory_id,
-                document=document,
-                metadata=metadata,
-                score=float(final_score),
-                raw_similarity=float(raw_similarity),
-                age_days=float(age_days)
-            ))
-        
-        # Sort by final score and return top k
-        scored_results.sort(key=lambda x: x.score, reverse=True)
-        return scored_results[:k]
+        raw_similarities = chroma_service.distances_to_similarities(results["distances"][0])
+        # Scores come straight from the reranker, so skip re-validation
+        recall_results = [
+            RecallResult.model_construct(**result)
+            for result in _rerank_candidates(results, raw_similarities, k=k, decay=decay)
+        ]
+        recall_cache.add(query_embedding, cache_params, recall_results)
+        return recall_results
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error recalling memories: {str(e)}")
 
 
+def _rerank_candidates(
+    results: Dict[str, list],
+    raw_similarities: np.ndarray,
+    *,
+    k: int,
+    decay: bool,
+    alpha: float = 0.7,
+    decay_rate: float = 0.01
+) -> List[dict]:
+    """Rerank query candidates by similarity, recency and importance.
+    
+    Args:
+        results: ChromaDB query results for a single query
+        raw_similarities: Cosine similarity of each candidate to the query
+        k: Number of results to return
+        decay: Whether to apply temporal decay
+        alpha: Weight for recency vs importance
+        decay_rate: Recency weight lost per day of age
+        
+    Returns:
+        Top k candidates as recall result dicts, best first
+    """
+    ids = results["ids"][0]
+    documents = results["documents"][0]
+    metadatas = results["metadatas"][0]
+    
+    # Calculate ages and recency weights (float32 throughout)
+    ages = calculate_metadata_ages_days(metadatas).astype(np.float32)
+    if decay:
+        recency_weights = np.maximum(np.float32(0.0), np.float32(1.0) - np.float32(decay_rate) * ages)
+    else:
+        recency_weights = np.ones_like(ages)
+    
+    # Calculate final scores
+    importances = np.array(
+        [meta.get("importance", 0.5) for meta in metadatas], dtype=np.float32
+    )
+    final_scores = raw_similarities * (alpha * recency_weights + (1 - alpha) * importances)
+    
+    # Select the top k in linear time, then sort only those by score
+    top_k = min(k, len(final_scores))
+    top_indices = np.argpartition(-final_scores, top_k - 1)[:top_k]
+    top_indices = top_indices[np.argsort(-final_scores[top_indices], kind="stable")]
+    
+    # Convert surviving values to Python floats in one pass each
+    return [
+        {
+            "id": ids[i],
+            "document": documents[i],
+            "metadata": metadatas[i],
+            "score": score,
+            "raw_similarity": raw_similarity,
+            "age_days": age_days
+        }
+        for i, score, raw_similarity, age_days in zip(
+            top_indices.tolist(),
+            final_scores[top_indices].tolist(),
+            raw_similarities[top_indices].tolist(),
+            ages[top_indices].tolist()
+        )
+    ]
+
+
 @router.get("/collections", response_model=List[CollectionInfo])
 async def list_collections():
     """List all ChromaDB collections.
@@ -179,10 +349,15 @@ async def list_collections():
         List of collection metadata
     """
     init_services()
+    await _flush_writes()
+    
+    cached = response_cache.get(("collections",))
+    if cached is not None:
+        return cached
     
     try:
         collections = chroma_service.list_collections()
-        return [
+        response = [
             CollectionInfo(
                 name=col["name"],
                 count=col["count"],
@@ -190,6 +365,8 @@ async def list_collections():
             )
             for col in collections
         ]
+        response_cache.set(("collections",), response, ttl=60)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing collections: {str(e)}")
 
@@ -209,9 +386,10 @@ async def get_collection_sample(
         Sample documents with metadata and embedding previews
     """
     init_services()
+    await _flush_writes()
     
     try:
-        sample = chroma_service.get_collection_sample(name, n)
+        sample = await asyncio.to_thread(chroma_service.get_collection_sample, name, n)
         return sample
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Collection not found: {str(e)}")
@@ -225,9 +403,12 @@ async def compact():
         Compaction statistics
     """
     init_services()
+    await _flush_writes()
     
     try:
-        stats = compaction_service.run_compaction()
+        stats = await asyncio.to_thread(compaction_service.run_compaction)
+        # The merge log changed too, not just the collection
+        invalidate_caches()
         return CompactionStats(**stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during compaction: {str(e)}")
@@ -241,37 +422,16 @@ async def get_stats():
         Overall system stats
     """
     init_services()
+    await _flush_writes()
+    
+    cached = response_cache.get(("stats",))
+    if cached is not None:
+        return cached
     
     try:
-        # Get all memories
-        all_data = chroma_service.get_all_memories()
-        total_memories = len(all_data["ids"])
-        
-        # Calculate average age
-        if total_memories > 0:
-            ages = [calculate_age_days(meta["timestamp"]) for meta in all_data["metadatas"]]
-            average_age = sum(ages) / len(ages)
-        else:
-            average_age = 0.0
-        
-        # Count topics
-        topics = {}
-        for meta in all_data["metadatas"]:
-            topic = meta.get("topic", "untagged")
-            topics[topic] = topics.get(topic, 0) + 1
-        
-        # Get merge history
-        total_merges = merge_logger.get_total_merges()
-        merge_log = merge_logger.read_log()
-        last_compaction = merge_log[-1]["timestamp"] if merge_log else None
-        
-        return StatsResponse(
-            total_memories=total_memories,
-            total_merges=total_merges,
-            average_age_days=float(average_age),
-            topics=topics,
-            last_compaction=last_compaction
-        )
+        response = await asyncio.to_thread(_build_stats)
+        response_cache.set(("stats",), response, ttl=15)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
 
@@ -289,52 +449,204 @@ async def get_umap_projection(
         2D coordinates and metadata for plotting
     """
     init_services()
+    await _flush_writes()
+    
+    cached = response_cache.get(("umap", n))
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
     try:
         # Get memories
-        all_data = chroma_service.get_all_memories(limit=n)
+        all_data = await asyncio.to_thread(chroma_service.get_all_memories, limit=n)
         
-        if not all_data["ids"] or len(all_data["ids"]) < 2:
-            return {"points": [], "message": "Not enough data for projection"}
+        projection = await asyncio.to_thread(_build_projection, all_data)
+        # Encode the large untyped payload once with orjson, skipping jsonable_encoder
+        content = orjson.dumps(projection)
+        response_cache.set(("umap", n), content, ttl=120)
+        return Response(content=content, media_type="application/json")
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating projection: {str(e)}")
+
+
+@router.get("/dashboard/point/{memory_id}")
+async def get_projection_point(memory_id: str):
+    """Get the full document and metadata of a projected memory.
+    
+    Args:
+        memory_id: ID of the memory
         
-        embeddings = np.array(all_data["embeddings"])
+    Returns:
+        Memory id, document and metadata
+    """
+    init_services()
+    await _flush_writes()
+    
+    memory = await asyncio.to_thread(chroma_service.get_memory, memory_id)
+    if memory is None:
+        raise HTTPException(status_code=404, detail=f"Memory not found: {memory_id}")
+    return memory
+
+
+def _build_stats() -> StatsResponse:
+    """Compute system statistics from the collection's running aggregates.
+    
+    Returns:
+        Overall system stats
+    """
+    summary = chroma_service.get_stats_summary()
+    
+    # Get merge history
+    total_merges = merge_logger.get_total_merges()
+    last_event = merge_logger.read_tail(1)
+    last_compaction = last_event[0]["timestamp"] if last_event else None
+    
+    return StatsResponse(
+        total_memories=summary["total_memories"],
+        total_merges=total_merges,
+        average_age_days=float(summary["average_age_days"]),
+        topics=summary["topics"],
+        last_compaction=last_compaction
+    )
+
+
+def _build_projection(all_data: Dict[str, list]) -> dict:
+    """Compute the 2D projection payload for a set of memories.
+    
+    Args:
+        all_data: Memories with ids, embeddings, documents and metadatas
         
-        # Determine projection method based on data size
-        if len(embeddings) < 10:
-            # Too few points for UMAP, use PCA
-            reducer = PCA(n_components=2, random_state=42)
-            coords_2d = reducer.fit_transform(embeddings)
+    Returns:
+        2D coordinates and metadata for plotting
+    """
+    if not all_data["ids"] or len(all_data["ids"]) < 2:
+        return {"points": [], "message": "Not enough data for projection"}
+    
+    embeddings = np.asarray(all_data["embeddings"], dtype=np.float32)
+    
+    # Determine projection method based on data size
+    if len(embeddings) < 10:
+        # Too few points for UMAP, use PCA
+        from sklearn.decomposition import PCA
+        
+        reducer = PCA(n_components=2, random_state=42)
+        coords_2d = reducer.fit_transform(embeddings)
+    else:
+        # Use UMAP for better clustering visualization
+        coords_2d = _project_umap(all_data["ids"], embeddings)
+    
+    # Prepare response
+    ages = calculate_metadata_ages_days(all_data["metadatas"])
+    points = []
+    # Convert coordinates and ages to Python floats in one pass each
+    for i, ((x, y), age_days) in enumerate(zip(coords_2d.tolist(), ages.tolist())):
+        points.append({
+            "id": all_data["ids"][i],
+            "x": x,
+            "y": y,
+            "document": all_data["documents"][i][:PROJECTION_DOCUMENT_CHARS],
+            "metadata": all_data["metadatas"][i],
+            "age_days": age_days
+        })
+    
+    return {
+        "points": points,
+        "projection_method": "UMAP" if len(embeddings) >= 10 else "PCA",
+        "total_points": len(points)
+    }
+
+
+async def _snapshot(n: int = 100) -> Tuple[StatsResponse, dict]:
+    """Compute stats and a projection of up to `n` points.
+    
+    Stats come from running aggregates, so only the projected points
+    are fetched from the collection.
+    
+    Args:
+        n: Maximum number of points to project
+        
+    Returns:
+        Stats response and projection payload
+    """
+    stats = await asyncio.to_thread(_build_stats)
+    all_data = await asyncio.to_thread(chroma_service.get_all_memories, limit=n)
+    projection = await asyncio.to_thread(_build_projection, all_data)
+    return stats, projection
+
+
+def _project_umap(ids: List[str], embeddings: np.ndarray) -> np.ndarray:
+    """Project embeddings to 2D with UMAP, reusing the last fitted reducer.
+    
+    Identical id sets return the cached coordinates. When most ids were
+    already projected, only the new ones go through `reducer.transform`;
+    otherwise the reducer is refit. High-dimensional embeddings are first
+    PCA-reduced to `UMAP_PCA_DIMENSIONS`, which cuts neighbor-graph cost.
+    
+    Args:
+        ids: Memory IDs, aligned with embeddings
+        embeddings: Embedding matrix, shape (len(ids), dimension)
+        
+    Returns:
+        2D coordinates, shape (len(ids), 2)
+    """
+    # Imported lazily: umap and sklearn pull in numba and scipy, which only
+    # the dashboard projection needs
+    from sklearn.decomposition import PCA
+    from umap import UMAP
+    
+    with _umap_lock:
+        key = hash(tuple(ids))
+        if _umap_cache.get("key") == key:
+            return _umap_cache["coords"]
+        
+        positions = _umap_cache.get("positions", {})
+        known = [i for i, memory_id in enumerate(ids) if memory_id in positions]
+        
+        if len(known) >= len(ids) / 2:
+            # Reuse cached coordinates and only project newcomers
+            coords_2d = np.empty((len(ids), 2), dtype=np.float32)
+            for i in known:
+                coords_2d[i] = positions[ids[i]]
+            new = [i for i, memory_id in enumerate(ids) if memory_id not in positions]
+            pca = _umap_cache["pca"]
+            reducer = _umap_cache["reducer"]
+            if new:
+                new_embeddings = embeddings[new]
+                if pca is not None:
+                    new_embeddings = pca.transform(new_embeddings)
+                coords_2d[new] = reducer.transform(new_embeddings)
         else:
-            # Use UMAP for better clustering visualization
+            pca = None
+            if embeddings.shape[1] > UMAP_PCA_DIMENSIONS:
+                pca = PCA(
+                    n_components=min(UMAP_PCA_DIMENSIONS, len(embeddings)),
+                    random_state=42
+                )
+                embeddings = pca.fit_transform(embeddings).astype(np.float32)
+            
+            # Stored embeddings are unit-length, where euclidean distance
+            # ranks neighbors like cosine (PCA is an orthogonal projection
+            # that approximately preserves it) and takes UMAP's faster path.
+            # PCA initialization converges in fewer epochs than spectral.
             reducer = UMAP(
                 n_components=2,
                 n_neighbors=min(15, len(embeddings) - 1),
                 min_dist=0.1,
-                metric='cosine',
+                metric='euclidean',
+                init='pca',
+                low_memory=True,
                 random_state=42
             )
             coords_2d = reducer.fit_transform(embeddings)
         
-        # Prepare response
-        points = []
-        for i, (x, y) in enumerate(coords_2d):
-            points.append({
-                "id": all_data["ids"][i],
-                "x": float(x),
-                "y": float(y),
-                "document": all_data["documents"][i][:200],  # Truncate for performance
-                "metadata": all_data["metadatas"][i],
-                "age_days": calculate_age_days(all_data["metadatas"][i]["timestamp"])
-            })
-        
-        return {
-            "points": points,
-            "projection_method": "UMAP" if len(embeddings) >= 10 else "PCA",
-            "total_points": len(points)
-        }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating projection: {str(e)}")
+        _umap_cache.update({
+            "key": key,
+            "pca": pca,
+            "reducer": reducer,
+            "coords": coords_2d,
+            "positions": {memory_id: coords_2d[i] for i, memory_id in enumerate(ids)}
+        })
+        return coords_2d
 
 
 @router.get("/dashboard/compaction-log")
@@ -349,13 +661,35 @@ async def get_compaction_log(
     Returns:
         List of merge events
     """
+    cached = response_cache.get(("compaction-log", limit))
+    if cached is not None:
+        return cached
+    
     try:
-        events = merge_logger.read_log()
-        return {"events": events[-limit:], "total_events": len(events)}
+        response = {
+            "events": merge_logger.read_tail(limit),
+            "total_events": merge_logger.get_total_merges()
+        }
+        response_cache.set(("compaction-log", limit), response, ttl=30)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading log: {str(e)}")
 
 
+@router.post("/cache/clear")
+async def clear_cache():
+    """Clear the query embedding cache and all cached responses.
+    
+    Returns:
+        Cache status
+    """
+    init_services()
+    
+    embedding_service.clear_query_cache()
+    invalidate_caches()
+    return {"status": "cleared"}
+
+
 @router.post("/demo")
 async def run_demo():
     """Run a comprehensive TraceMind lifecycle demo.
@@ -395,28 +729,27 @@ async def run_demo():
         ]
         
         # Clear existing data
-        chroma_service.clear_collection()
+        await write_buffer.flush()
+        await asyncio.to_thread(chroma_service.clear_collection)
         merge_logger.clear_log()
         
         demo_phases = []
         
         # Phase 1: Add initial memories
+        texts = [m["text"] for m in phase1_memories]
+        embeddings = await asyncio.to_thread(embedding_service.embed, texts)
+        metadatas = []
         for memory in phase1_memories:
-            embedding = embedding_service.embed_single(memory["text"])
             metadata = create_metadata(
                 importance=memory["importance"],
-                topic=memory["topic"]
-            )
-            # Simulate older timestamp (2 days ago)
-            metadata["timestamp"] = (datetime.now() - timedelta(days=2)).isoformat()
-            chroma_service.add_memory(
-                text=memory["text"],
-                embedding=embedding,
-                metadata=metadata
+                topic=memory["topic"],
+                # Simulate older timestamp (2 days ago)
+                timestamp=get_utc_now() - timedelta(days=2)
             )
+            metadatas.append(metadata)
+        await asyncio.to_thread(chroma_service.add_memories, texts, embeddings, metadatas)
         
-        phase1_stats = await get_stats()
-        phase1_umap = await get_umap_projection(n=100)
+        phase1_stats, phase1_umap = await _snapshot(n=100)
         
         demo_phases.append({
             "phase": 1,
@@ -428,22 +761,20 @@ async def run_demo():
         })
         
         # Phase 2: Add more memories (simulate next day)
+        texts = [m["text"] for m in phase2_memories]
+        embeddings = await asyncio.to_thread(embedding_service.embed, texts)
+        metadatas = []
         for memory in phase2_memories:
-            embedding = embedding_service.embed_single(memory["text"])
             metadata = create_metadata(
                 importance=memory["importance"],
-                topic=memory["topic"]
-            )
-            # Simulate yesterday
-            metadata["timestamp"] = (datetime.now() - timedelta(days=1)).isoformat()
-            chroma_service.add_memory(
-                text=memory["text"],
-                embedding=embedding,
-                metadata=metadata
+                topic=memory["topic"],
+                # Simulate yesterday
+                timestamp=get_utc_now() - timedelta(days=1)
             )
+            metadatas.append(metadata)
+        await asyncio.to_thread(chroma_service.add_memories, texts, embeddings, metadatas)
         
-        phase2_stats = await get_stats()
-        phase2_umap = await get_umap_projection(n=100)
+        phase2_stats, phase2_umap = await _snapshot(n=100)
         
         demo_phases.append({
             "phase": 2,
@@ -455,10 +786,10 @@ async def run_demo():
         })
         
         # Phase 3: First compaction
-        compaction1_stats = compaction_service.run_compaction()
+        compaction1_stats = await asyncio.to_thread(compaction_service.run_compaction)
         
-        phase3_stats = await get_stats()
-        phase3_umap = await get_umap_projection(n=100)
+        invalidate_caches()
+        phase3_stats, phase3_umap = await _snapshot(n=100)
         
         demo_phases.append({
             "phase": 3,
@@ -470,21 +801,19 @@ async def run_demo():
         })
         
         # Phase 4: Add recent memories
+        texts = [m["text"] for m in phase3_memories]
+        embeddings = await asyncio.to_thread(embedding_service.embed, texts)
+        metadatas = []
         for memory in phase3_memories:
-            embedding = embedding_service.embed_single(memory["text"])
             metadata = create_metadata(
                 importance=memory["importance"],
                 topic=memory["topic"]
             )
             # Current timestamp
-            chroma_service.add_memory(
-                text=memory["text"],
-                embedding=embedding,
-                metadata=metadata
-            )
+            metadatas.append(metadata)
+        await asyncio.to_thread(chroma_service.add_memories, texts, embeddings, metadatas)
         
-        phase4_stats = await get_stats()
-        phase4_umap = await get_umap_projection(n=100)
+        phase4_stats, phase4_umap = await _snapshot(n=100)
         
         demo_phases.append({
             "phase": 4,
@@ -496,10 +825,10 @@ async def run_demo():
         })
         
         # Phase 5: Second compaction
-        compaction2_stats = compaction_service.run_compaction()
+        compaction2_stats = await asyncio.to_thread(compaction_service.run_compaction)
         
-        phase5_stats = await get_stats()
-        phase5_umap = await get_umap_projection(n=100)
+        invalidate_caches()
+        phase5_stats, phase5_umap = await _snapshot(n=100)
         compaction_log = await get_compaction_log(limit=50)
         
         demo_phases.append({
@@ -522,11 +851,12 @@ async def run_demo():
         recall_results = []
         for test in recall_tests:
             # Call recall logic directly instead of the endpoint
-            query_embedding = embedding_service.embed_single(test["query"])
+            query_embedding = await asyncio.to_thread(embedding_service.embed_query, test["query"])
             k_raw = min(3 * 2, 100)
             where_filter = None  # No topic filter for demo
             
-            results = chroma_service.query_memories(
+            results = await asyncio.to_thread(
+                chroma_service.query_memories,
                 query_embedding=query_embedding,
                 n_results=k_raw,
                 where=where_filter
@@ -534,34 +864,8 @@ async def run_demo():
             
             if results["ids"][0]:
                 # Rerank with temporal decay
-                scored_results = []
-                alpha = 0.7
-                decay_rate = 0.01
-                
-                for i in range(len(results["ids"][0])):
-                    memory_id = results["ids"][0][i]
-                    document = results["documents"][0][i]
-                    metadata = results["metadatas"][0][i]
-                    embedding = np.array(results["embeddings"][0][i])
-                    
-                    raw_similarity = cosine_similarity(query_embedding, embedding)
-                    age_days = calculate_age_days(metadata["timestamp"])
-                    recency_weight = max(0, 1 - decay_rate * age_days)
-                    
-                    importance = metadata.get("importance", 0.5)
-                    final_score = raw_similarity * (alpha * recency_weight + (1 - alpha) * importance)
-                    
-                    scored_results.append({
-                        "id": memory_id,
-                        "document": document,
-                        "metadata": metadata,
-                        "score": float(final_score),
-                        "raw_similarity": float(raw_similarity),
-                        "age_days": float(age_days)
-                    })
-                
-                scored_results.sort(key=lambda x: x["score"], reverse=True)
-                top_results = scored_results[:3]
+                raw_similarities = chroma_service.distances_to_similarities(results["distances"][0])
+                top_results = _rerank_candidates(results, raw_similarities, k=3, decay=True)
             else:
                 top_results = []
             
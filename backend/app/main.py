@@ -1,16 +1,17 @@
 """Main FastAPI application for TraceMind."""
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.background import BackgroundScheduler
 from contextlib import asynccontextmanager
 
-from app.api.routes import router, init_services
+from app.api.routes import router, init_services, invalidate_caches
 from app.services.compaction import get_compaction_service
 from app.services.chroma_client import get_chroma_service
 from app.services.embeddings import get_embedding_service
+from app.services.write_buffer import get_write_buffer
 
-# Scheduler for periodic compaction
-scheduler = BackgroundScheduler()
+# Seconds between scheduled compaction runs
+COMPACTION_INTERVAL_SECONDS = 30 * 60
 
 
 def scheduled_compaction():
@@ -21,11 +22,19 @@ def scheduled_compaction():
         embeddings = get_embedding_service()
         compaction = get_compaction_service(chroma, embeddings)
         stats = compaction.run_compaction()
+        invalidate_caches()
         print(f"Scheduled compaction complete: {stats['before_count']} -> {stats['after_count']}")
     except Exception as e:
         print(f"Error in scheduled compaction: {e}")
 
 
+async def periodic_compaction():
+    """Run compaction every interval, off the event loop."""
+    while True:
+        await asyncio.sleep(COMPACTION_INTERVAL_SECONDS)
+        await asyncio.to_thread(scheduled_compaction)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events."""
@@ -35,21 +44,23 @@ async def lifespan(app: FastAPI):
     # Initialize services
     init_services()
     
-    # Start scheduler (run compaction every 30 minutes)
-    scheduler.add_job(
-        scheduled_compaction,
-        'interval',
-        minutes=30,
-        id='compaction_job'
-    )
-    scheduler.start()
-    print("Scheduler started (compaction runs every 30 minutes)")
+    # Start batching /remember writes (flushes every 100 ms or 64 memories)
+    write_buffer = get_write_buffer(get_chroma_service())
+    flush_task = asyncio.create_task(write_buffer.run())
+    
+    # Start periodic compaction (runs every 30 minutes)
+    compaction_task = asyncio.create_task(periodic_compaction())
+    print("Compaction task started (compaction runs every 30 minutes)")
     
     yield
     
     # Shutdown
     print("Shutting down TraceMind backend...")
-    scheduler.shutdown()
+    compaction_task.cancel()
+    flush_task.cancel()
+    await asyncio.gather(compaction_task, flush_task, return_exceptions=True)
+    # Write anything queued since the last flush
+    await write_buffer.flush()
 
 
 # Create FastAPI app
@@ -91,5 +102,15 @@ async def health():
 
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # uvicorn[standard] installs uvloop and httptools where they're supported
+    # (uvloop has no Windows build); use them only when they're present
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11"
+    )
@@ -1,12 +1,63 @@
 """ChromaDB client wrapper for TraceMind."""
+import threading
 import uuid
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from typing import Callable, List, Dict, Any, Optional
 import chromadb
 import numpy as np
+from chromadb.config import Settings
+from chromadb.errors import ChromaError
+
+from ..utils import normalize_embedding, metadata_timestamps, get_utc_now
+
+
+class CollectionStats:
+    """Running aggregates over memory metadata.
+    
+    Tracks the count, topic histogram and sum of timestamps so stats can
+    be served without scanning the collection. The average age follows
+    from the timestamp sum at read time, so it stays exact as time passes.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.topics: Counter = Counter()
+        self.timestamp_sum = 0.0
+    
+    def add(self, metadatas: List[Dict[str, Any]]):
+        """Fold newly stored memories into the aggregates."""
+        self.count += len(metadatas)
+        self.topics.update(meta.get("topic", "untagged") for meta in metadatas)
+        self.timestamp_sum += float(metadata_timestamps(metadatas).sum())
+    
+    def summary(self) -> Dict[str, Any]:
+        """Get count, topic histogram and average age in days."""
+        if self.count > 0:
+            mean_timestamp = self.timestamp_sum / self.count
+            average_age = (get_utc_now().timestamp() - mean_timestamp) / 86400.0
+        else:
+            average_age = 0.0
+        return {
+            "total_memories": self.count,
+            "topics": dict(self.topics),
+            "average_age_days": average_age
+        }
 
 
 class ChromaService:
-    """Service for interacting with ChromaDB."""
+    """Service for interacting with ChromaDB.
+    
+    All stored embeddings are L2-normalized, so cosine similarity against
+    them reduces to a plain dot product. Every write path must go through
+    `normalize_embedding` to keep this invariant.
+    """
+    
+    MIGRATION_BATCH_SIZE = 1000
+    
+    # HNSW index settings for new collections
+    HNSW_M = 16
+    HNSW_CONSTRUCTION_EF = 100
+    HNSW_SEARCH_EF = 64
     
     def __init__(self, persist_directory: str = "./chroma_db"):
         """Initialize ChromaDB client.
@@ -15,17 +66,71 @@ class ChromaService:
             persist_directory: Directory for persistent storage
         """
         print(f"Initializing ChromaDB at: {persist_directory}")
-        self.client = chromadb.PersistentClient(path=persist_directory)
+        self.client = chromadb.PersistentClient(
+            path=persist_directory,
+            settings=Settings(anonymized_telemetry=False)
+        )
         self.collection_name = "memories"
         self.collection = self._get_or_create_collection()
+        # Aggregates for stats; None until built from a metadata scan
+        self._stats: Optional[CollectionStats] = None
+        self._stats_lock = threading.Lock()
+        # Callbacks run after every write, e.g. to drop cached responses
+        self._change_listeners: List[Callable[[], None]] = []
+        if not (self.collection.metadata or {}).get("embeddings_normalized"):
+            self._normalize_stored_embeddings()
         print(f"Collection '{self.collection_name}' ready with {self.collection.count()} items")
     
     def _get_or_create_collection(self) -> Any:
-        """Get or create the memories collection."""
-        return self.client.get_or_create_collection(
-            name=self.collection_name,
-            metadata={"description": "TraceMind memories"}
-        )
+        """Get or create the memories collection.
+        
+        Creation metadata is only applied to new collections, so an existing
+        collection keeps its own flags and index settings.
+        """
+        try:
+            return self.client.get_collection(name=self.collection_name)
+        except (ValueError, ChromaError):
+            return self.client.create_collection(
+                name=self.collection_name,
+                metadata={
+                    "description": "TraceMind memories",
+                    "embeddings_normalized": True,
+                    "hnsw:space": "cosine",
+                    "hnsw:M": self.HNSW_M,
+                    "hnsw:construction_ef": self.HNSW_CONSTRUCTION_EF,
+                    "hnsw:search_ef": self.HNSW_SEARCH_EF
+                }
+            )
+    
+    def _normalize_stored_embeddings(self):
+        """One-time migration normalizing embeddings stored before the invariant."""
+        print(f"Normalizing stored embeddings in '{self.collection_name}'...")
+        
+        # Page through the collection so only one batch is held in memory
+        offset = 0
+        while True:
+            data = self.collection.get(
+                include=["embeddings"],
+                limit=self.MIGRATION_BATCH_SIZE,
+                offset=offset
+            )
+            if not data["ids"]:
+                break
+            self.collection.update(
+                ids=data["ids"],
+                embeddings=normalize_embedding(data["embeddings"])
+            )
+            offset += len(data["ids"])
+        
+        # Index settings can't be passed to modify(), keep only plain keys
+        metadata = {
+            key: value
+            for key, value in (self.collection.metadata or {}).items()
+            if not key.startswith("hnsw:")
+        }
+        metadata["embeddings_normalized"] = True
+        self.collection.modify(metadata=metadata)
+        print(f"Normalized {offset} embeddings")
     
     def add_memory(
         self,
@@ -45,20 +150,59 @@ class ChromaService:
         """
         memory_id = str(uuid.uuid4())
         
-        self.collection.add(
-            ids=[memory_id],
-            documents=[text],
-            embeddings=[embedding.tolist()],
-            metadatas=[metadata]
-        )
+        with self._stats_lock:
+            self.collection.add(
+                ids=[memory_id],
+                documents=[text],
+                embeddings=normalize_embedding(embedding)[np.newaxis],
+                metadatas=[metadata]
+            )
+            if self._stats is not None:
+                self._stats.add([metadata])
+        self._notify_change()
         
         return memory_id
     
+    def add_memories(
+        self,
+        texts: List[str],
+        embeddings: np.ndarray,
+        metadatas: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """Add several memories in a single ChromaDB call.
+        
+        Args:
+            texts: Memory text contents
+            embeddings: Vector embeddings, shape (len(texts), dimension)
+            metadatas: Metadata dicts, aligned with texts
+            ids: Optional IDs to store the memories under (new UUIDs if None)
+            
+        Returns:
+            IDs of the created memories
+        """
+        memory_ids = ids if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        
+        if memory_ids:
+            with self._stats_lock:
+                self.collection.add(
+                    ids=memory_ids,
+                    documents=texts,
+                    embeddings=normalize_embedding(embeddings),
+                    metadatas=metadatas
+                )
+                if self._stats is not None:
+                    self._stats.add(metadatas)
+            self._notify_change()
+        
+        return memory_ids
+    
     def query_memories(
         self,
         query_embedding: np.ndarray,
         n_results: int = 10,
-        where: Optional[Dict] = None
+        where: Optional[Dict] = None,
+        include: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """Query memories by embedding similarity.
         
@@ -66,33 +210,89 @@ class ChromaService:
             query_embedding: Query vector
             n_results: Number of results to return
             where: Metadata filter dict
+            include: Fields to fetch; defaults to documents, metadatas and
+                distances. Use `distances_to_similarities` for cosine scores.
             
         Returns:
             Query results from ChromaDB
         """
+        if include is None:
+            include = ["documents", "metadatas", "distances"]
         results = self.collection.query(
-            query_embeddings=[query_embedding.tolist()],
+            query_embeddings=normalize_embedding(query_embedding)[np.newaxis],
             n_results=n_results,
             where=where,
-            include=["documents", "metadatas", "embeddings", "distances"]
+            include=include
         )
         return results
     
-    def get_all_memories(self, limit: Optional[int] = None) -> Dict[str, Any]:
+    def distances_to_similarities(self, distances: List[float]) -> np.ndarray:
+        """Convert query distances to cosine similarities.
+        
+        Relies on stored and query embeddings being unit-length.
+        
+        Args:
+            distances: Distances returned by `query_memories`
+            
+        Returns:
+            Cosine similarities, aligned with distances
+        """
+        distances = np.asarray(distances, dtype=np.float32)
+        if self._distance_space() == "l2":
+            # Squared L2 between unit vectors is 2 - 2 * cosine
+            return 1.0 - distances / 2.0
+        # Cosine distance is 1 - cosine, inner product distance is 1 - dot
+        return 1.0 - distances
+    
+    def _distance_space(self) -> str:
+        """Get the distance function of the memories collection."""
+        configuration = getattr(self.collection, "configuration", None) or {}
+        space = (configuration.get("hnsw") or {}).get("space")
+        if space is None:
+            space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        return space
+    
+    def get_all_memories(
+        self,
+        limit: Optional[int] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
         """Get all memories from the collection.
         
         Args:
             limit: Optional limit on number of results
+            include: Fields to fetch; defaults to documents, metadatas and
+                embeddings. Leave out embeddings when they aren't needed.
             
         Returns:
-            All memories with embeddings and metadata
+            All memories with the requested fields
         """
+        if include is None:
+            include = ["documents", "metadatas", "embeddings"]
         result = self.collection.get(
-            include=["documents", "metadatas", "embeddings"],
+            include=include,
             limit=limit
         )
         return result
     
+    def get_memory(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single memory by ID.
+        
+        Args:
+            memory_id: ID of the memory
+            
+        Returns:
+            Dict with id, document and metadata, or None if not found
+        """
+        result = self.collection.get(ids=[memory_id], include=["documents", "metadatas"])
+        if not result["ids"]:
+            return None
+        return {
+            "id": result["ids"][0],
+            "document": result["documents"][0],
+            "metadata": result["metadatas"][0]
+        }
+    
     def delete_memories(self, ids: List[str]):
         """Delete memories by IDs.
         
@@ -100,7 +300,11 @@ class ChromaService:
             ids: List of memory IDs to delete
         """
         if ids:
-            self.collection.delete(ids=ids)
+            with self._stats_lock:
+                self.collection.delete(ids=ids)
+                # Deleted metadata is unknown here, rebuild on next read
+                self._stats = None
+            self._notify_change()
     
     def update_memory(
         self,
@@ -122,16 +326,36 @@ class ChromaService:
         if document is not None:
             update_args["documents"] = [document]
         if embedding is not None:
-            update_args["embeddings"] = [embedding.tolist()]
+            update_args["embeddings"] = normalize_embedding(embedding)[np.newaxis]
         if metadata is not None:
             update_args["metadatas"] = [metadata]
         
-        self.collection.update(**update_args)
+        with self._stats_lock:
+            self.collection.update(**update_args)
+            if metadata is not None:
+                self._stats = None
+        self._notify_change()
     
     def count(self) -> int:
         """Get total number of memories."""
         return self.collection.count()
     
+    def get_stats_summary(self) -> Dict[str, Any]:
+        """Get memory count, topic histogram and average age.
+        
+        Served from running aggregates; the collection is only scanned
+        on the first call and after deletes or metadata updates.
+        
+        Returns:
+            Dict with total_memories, topics and average_age_days
+        """
+        with self._stats_lock:
+            if self._stats is None:
+                data = self.collection.get(include=["metadatas"])
+                self._stats = CollectionStats()
+                self._stats.add(data["metadatas"])
+            return self._stats.summary()
+    
     def list_collections(self) -> List[Dict[str, Any]]:
         """List all ChromaDB collections with metadata.
         
@@ -168,21 +392,39 @@ class ChromaService:
             limit=n
         )
         
-        # Truncate embeddings for preview
-        if result.get("embeddings"):
+        # Truncate embeddings for preview (ChromaDB returns float32 arrays)
+        embeddings = result.get("embeddings")
+        if embeddings is not None and len(embeddings) > 0:
             result["embedding_previews"] = [
-                emb[:8] for emb in result["embeddings"]
+                emb[:8].tolist() for emb in embeddings
             ]
             # Remove full embeddings from response to reduce size
-            result["embedding_dimension"] = len(result["embeddings"][0]) if result["embeddings"] else 0
+            result["embedding_dimension"] = len(embeddings[0])
+        if embeddings is not None:
             del result["embeddings"]
         
         return result
     
     def clear_collection(self):
         """Delete and recreate the collection (for testing)."""
-        self.client.delete_collection(self.collection_name)
-        self.collection = self._get_or_create_collection()
+        with self._stats_lock:
+            self.client.delete_collection(self.collection_name)
+            self.collection = self._get_or_create_collection()
+            self._stats = CollectionStats()
+        self._notify_change()
+    
+    def add_change_listener(self, listener: Callable[[], None]):
+        """Register a callback to run after the collection changes.
+        
+        Args:
+            listener: Function called with no arguments after each write
+        """
+        self._change_listeners.append(listener)
+    
+    def _notify_change(self):
+        """Run all change listeners."""
+        for listener in self._change_listeners:
+            listener()
 
 
 # Global instance
@@ -2,11 +2,13 @@
 from typing import List, Dict, Any, Set, Tuple
 from datetime import datetime
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, deque
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
 from ..utils import (
-    calculate_age_days,
-    cosine_similarity,
+    calculate_metadata_ages_days,
+    metadata_timestamps,
     get_utc_now,
     to_iso_string,
     MergeLogger
@@ -23,6 +25,11 @@ class CompactionService:
     DECAY_RATE = 0.01
     DELETE_SIMILARITY_THRESHOLD = 0.88
     DELETE_AGE_THRESHOLD_DAYS = 30
+    # Collections at least this large find deletion neighbors through
+    # Chroma's HNSW index instead of an exact scan
+    ANN_MIN_MEMORIES = 5000
+    # Cross-check the computed after_count against collection.count()
+    VERIFY_COUNTS = False
     
     def __init__(self, chroma_service, embedding_service):
         """Initialize compaction service.
@@ -42,10 +49,10 @@ class CompactionService:
             Statistics about the compaction run
         """
         print("Starting compaction...")
-        before_count = self.chroma.count()
         
         # Fetch all memories
         all_data = self.chroma.get_all_memories()
+        before_count = len(all_data["ids"])
         
         if not all_data["ids"] or len(all_data["ids"]) < 2:
             print("Not enough memories to compact")
@@ -58,23 +65,33 @@ class CompactionService:
                 "timestamp": to_iso_string(get_utc_now())
             }
         
+        # Chroma returns float64 rows; convert once so clustering and the
+        # deletion scan share one contiguous float32 matrix without copies
+        all_data["embeddings"] = np.ascontiguousarray(all_data["embeddings"], dtype=np.float32)
+        
         # Build clusters
         clusters = self._build_clusters(
             all_data["ids"],
             all_data["embeddings"],
+            all_data["documents"],
             all_data["metadatas"]
         )
         
         print(f"Found {len(clusters)} clusters to merge")
         
+        clusters = [cluster for cluster in clusters if len(cluster["ids"]) >= 2]
+        merged_ids = {memory_id for cluster in clusters for memory_id in cluster["ids"]}
+        
+        # Delete low-importance old redundant memories before writing merges,
+        # so the exact and HNSW neighbor searches both see the memories as
+        # fetched; cluster members are left to the merge
+        deleted_count = self._delete_redundant_memories(all_data, skip_ids=merged_ids)
+        
         # Merge clusters
+        new_ids = self._merge_clusters(clusters)
+        
         merge_events = []
-        for cluster in clusters:
-            if len(cluster["ids"]) < 2:
-                continue
-            
-            merged_id = self._merge_cluster(cluster)
-            
+        for cluster, merged_id in zip(clusters, new_ids):
             event = {
                 "timestamp": to_iso_string(get_utc_now()),
                 "cluster_size": len(cluster["ids"]),
@@ -85,10 +102,10 @@ class CompactionService:
             merge_events.append(event)
             self.merge_logger.log_merge(event)
         
-        # Delete low-importance old redundant memories
-        deleted_count = self._delete_redundant_memories(all_data)
-        
-        after_count = self.chroma.count()
+        # Each merge replaces its cluster with one memory
+        after_count = before_count - (len(merged_ids) - len(merge_events)) - deleted_count
+        if self.VERIFY_COUNTS and after_count != self.chroma.count():
+            print(f"Compaction count mismatch: computed {after_count}, stored {self.chroma.count()}")
         
         stats = {
             "before_count": before_count,
@@ -106,112 +123,173 @@ class CompactionService:
         self,
         ids: List[str],
         embeddings: List[List[float]],
+        documents: List[str],
         metadatas: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Build clusters of similar memories using single-linkage.
         
+        Single-linkage clusters at a threshold are the connected components
+        of the graph joining every pair with similarity >= SIM_THRESHOLD.
+        Components larger than MAX_CLUSTER_SIZE are split afterwards into
+        chunks that stay connected above the threshold (see
+        `_split_component`).
+        
         Args:
             ids: List of memory IDs
             embeddings: List of embedding vectors
+            documents: List of memory texts
             metadatas: List of metadata dicts
             
         Returns:
             List of cluster dicts
         """
-        n = len(ids)
-        embeddings_np = np.array(embeddings)
+        embeddings_np = np.ascontiguousarray(embeddings, dtype=np.float32)
+        
+        # Stored embeddings are unit-length, so one GEMM gives every cosine
+        similarities = embeddings_np @ embeddings_np.T
+        
+        # Label connected components of the above-threshold similarity graph
+        linked = similarities >= self.SIM_THRESHOLD
+        adjacency = csr_matrix(np.triu(linked, k=1))
+        _, labels = connected_components(adjacency, directed=False)
+        
+        # Parse timestamps once; merges pick the newest member from them
+        timestamps = metadata_timestamps(metadatas)
+        
+        # Group indices by component label
+        order = np.argsort(labels, kind="stable")
+        components = np.split(order, np.flatnonzero(np.diff(labels[order])) + 1)
+        components = [members for members in components if len(members) >= 2]
         
-        # Track which items are already in a cluster
-        clustered = set()
         clusters = []
+        for members in components:
+            # Limit cluster size
+            if len(members) > self.MAX_CLUSTER_SIZE:
+                chunks = self._split_component(members, similarities, linked)
+            else:
+                chunks = [members.tolist()]
+            for chunk in chunks:
+                # Only keep clusters with multiple items
+                if len(chunk) >= 2:
+                    clusters.append({
+                        "ids": [ids[k] for k in chunk],
+                        "embeddings": embeddings_np[chunk],
+                        "documents": [documents[k] for k in chunk],
+                        "metadatas": [metadatas[k] for k in chunk],
+                        "timestamps": timestamps[chunk]
+                    })
         
-        for i in range(n):
-            if ids[i] in clustered:
-                continue
-            
-            # Start new cluster with item i
-            cluster_ids = [ids[i]]
-            cluster_embeddings = [embeddings_np[i]]
-            cluster_docs = [self.chroma.collection.get(ids=[ids[i]])["documents"][0]]
-            cluster_metadatas = [metadatas[i]]
+        return clusters
+    
+    def _split_component(
+        self,
+        members: np.ndarray,
+        similarities: np.ndarray,
+        linked: np.ndarray
+    ) -> List[List[int]]:
+        """Split an oversized component into connected chunks.
+        
+        Members are ranked by similarity to the component's first member.
+        Each chunk grows breadth-first over above-threshold links from the
+        highest-ranked unassigned member, up to MAX_CLUSTER_SIZE, so every
+        chunk member is linked to the others through the chunk itself.
+        
+        Args:
+            members: Indices of the component's memories
+            similarities: Pairwise similarity matrix
+            linked: Pairwise above-threshold mask
             
-            # Find similar items for single-linkage clustering
-            for j in range(i + 1, n):
-                if ids[j] in clustered:
-                    continue
-                
-                # Check similarity with all items in current cluster
-                for cluster_emb in cluster_embeddings:
-                    sim = cosine_similarity(embeddings_np[j], cluster_emb)
-                    
-                    if sim >= self.SIM_THRESHOLD:
-                        cluster_ids.append(ids[j])
-                        cluster_embeddings.append(embeddings_np[j])
-                        cluster_docs.append(
-                            self.chroma.collection.get(ids=[ids[j]])["documents"][0]
-                        )
-                        cluster_metadatas.append(metadatas[j])
-                        clustered.add(ids[j])
+        Returns:
+            Lists of member indices, one per chunk
+        """
+        ranked = members[np.argsort(-similarities[members[0], members], kind="stable")].tolist()
+        unassigned = set(ranked)
+        chunks = []
+        
+        for seed in ranked:
+            if seed not in unassigned:
+                continue
+            unassigned.discard(seed)
+            chunk = [seed]
+            frontier = deque([seed])
+            while frontier and len(chunk) < self.MAX_CLUSTER_SIZE:
+                current = frontier.popleft()
+                for k in ranked:
+                    if len(chunk) >= self.MAX_CLUSTER_SIZE:
                         break
-                
-                # Limit cluster size
-                if len(cluster_ids) >= self.MAX_CLUSTER_SIZE:
-                    break
+                    if k in unassigned and linked[current, k]:
+                        unassigned.discard(k)
+                        chunk.append(k)
+                        frontier.append(k)
+            chunks.append(chunk)
+        
+        return chunks
+    
+    def _merge_clusters(self, clusters: List[Dict[str, Any]]) -> List[str]:
+        """Replace each cluster with a single merged memory.
+        
+        All merged memories are added in one ChromaDB call and all cluster
+        members deleted in another.
+        
+        Args:
+            clusters: Cluster dicts from `_build_clusters`
             
-            # Only keep clusters with multiple items
-            if len(cluster_ids) >= 2:
-                clustered.update(cluster_ids)
-                clusters.append({
-                    "ids": cluster_ids,
-                    "embeddings": cluster_embeddings,
-                    "documents": cluster_docs,
-                    "metadatas": cluster_metadatas
-                })
+        Returns:
+            IDs of the newly created merged memories, aligned with clusters
+        """
+        if not clusters:
+            return []
         
-        return clusters
+        merged = [self._merge_cluster(cluster) for cluster in clusters]
+        texts, embeddings, metadatas = zip(*merged)
+        
+        # Add merged memories
+        new_ids = self.chroma.add_memories(list(texts), np.stack(embeddings), list(metadatas))
+        
+        # Delete original cluster members
+        self.chroma.delete_memories(
+            [memory_id for cluster in clusters for memory_id in cluster["ids"]]
+        )
+        
+        return new_ids
     
-    def _merge_cluster(self, cluster: Dict[str, Any]) -> str:
-        """Merge a cluster into a single memory.
+    def _merge_cluster(self, cluster: Dict[str, Any]) -> Tuple[str, np.ndarray, Dict[str, Any]]:
+        """Compute the merged memory for a cluster.
         
         Args:
-            cluster: Cluster dict with ids, embeddings, documents, metadatas
+            cluster: Cluster dict with ids, stacked embeddings, documents,
+                metadatas and unix timestamps
             
         Returns:
-            ID of the newly created merged memory
+            Representative text, merged embedding and merged metadata
         """
         ids = cluster["ids"]
         embeddings = cluster["embeddings"]
         documents = cluster["documents"]
         metadatas = cluster["metadatas"]
+        timestamps = cluster["timestamps"]
         
         # Calculate weights based on importance and recency
-        weights = []
-        for meta in metadatas:
-            age_days = calculate_age_days(meta["timestamp"])
-            recency_weight = max(0, 1 - self.DECAY_RATE * age_days)
-            weight = meta["importance"] * recency_weight
-            weights.append(weight)
-        
-        weights = np.array(weights)
+        ages = (get_utc_now().timestamp() - timestamps) / 86400.0
+        recency_weights = np.maximum(0, 1 - self.DECAY_RATE * ages)
+        importances = np.array([meta["importance"] for meta in metadatas])
+        weights = (importances * recency_weights).astype(np.float32)
+        
         if weights.sum() == 0:
             weights = np.ones_like(weights)
-        weights = weights / weights.sum()
-        
-        # Compute weighted average embedding
-        embeddings_np = np.array(embeddings)
-        merged_embedding = np.sum(embeddings_np * weights[:, np.newaxis], axis=0)
         
-        # Normalize
-        merged_embedding = merged_embedding / np.linalg.norm(merged_embedding)
+        # Weighted sum in one pass; add_memories normalizes it, which makes
+        # dividing the weights by their sum unnecessary
+        merged_embedding = np.einsum('i,ij->j', weights, embeddings)
         
         # Choose representative text (newest)
-        timestamps = [meta["timestamp"] for meta in metadatas]
-        newest_idx = timestamps.index(max(timestamps))
+        newest_idx = int(np.argmax(timestamps))
         representative_text = documents[newest_idx]
         
         # Aggregate metadata
         merged_metadata = {
-            "timestamp": timestamps[newest_idx],
+            "timestamp": metadatas[newest_idx]["timestamp"],
+            "timestamp_epoch": float(timestamps[newest_idx]),
             "importance": max(meta["importance"] for meta in metadatas),
             "source": "compaction",
             "last_merged_at": to_iso_string(get_utc_now()),
@@ -222,23 +300,18 @@ class CompactionService:
         if "topic" in metadatas[newest_idx]:
             merged_metadata["topic"] = metadatas[newest_idx]["topic"]
         
-        # Add merged memory
-        new_id = self.chroma.add_memory(
-            text=representative_text,
-            embedding=merged_embedding,
-            metadata=merged_metadata
-        )
-        
-        # Delete original cluster members
-        self.chroma.delete_memories(ids)
-        
-        return new_id
+        return representative_text, merged_embedding, merged_metadata
     
-    def _delete_redundant_memories(self, all_data: Dict[str, Any]) -> int:
+    def _delete_redundant_memories(
+        self,
+        all_data: Dict[str, Any],
+        skip_ids: Set[str] = frozenset()
+    ) -> int:
         """Delete low-importance, old, redundant memories.
         
         Args:
             all_data: All memories data from ChromaDB
+            skip_ids: IDs about to be merged, which aren't deletion candidates
             
         Returns:
             Number of memories deleted
@@ -246,32 +319,76 @@ class CompactionService:
         to_delete = []
         
         ids = all_data["ids"]
-        embeddings = np.array(all_data["embeddings"])
+        embeddings = np.asarray(all_data["embeddings"], dtype=np.float32)
         metadatas = all_data["metadatas"]
         
-        for i, (memory_id, meta) in enumerate(zip(ids, metadatas)):
-            # Check deletion criteria
-            importance = meta.get("importance", 0.5)
-            age_days = calculate_age_days(meta["timestamp"])
-            
-            if (importance < self.MIN_IMPORTANCE_KEEP and 
-                age_days > self.DELETE_AGE_THRESHOLD_DAYS):
-                
-                # Check if there's a similar survivor
-                for j, other_emb in enumerate(embeddings):
-                    if i == j:
-                        continue
-                    
-                    sim = cosine_similarity(embeddings[i], other_emb)
-                    if sim >= self.DELETE_SIMILARITY_THRESHOLD:
-                        # Found similar memory, safe to delete this one
-                        to_delete.append(memory_id)
-                        break
+        # Check deletion criteria
+        ages = calculate_metadata_ages_days(metadatas)
+        importances = np.array([meta.get("importance", 0.5) for meta in metadatas])
+        candidates = [
+            i for i in np.flatnonzero(
+                (importances < self.MIN_IMPORTANCE_KEEP)
+                & (ages > self.DELETE_AGE_THRESHOLD_DAYS)
+            ).tolist()
+            if ids[i] not in skip_ids
+        ]
+        
+        if candidates:
+            # Safe to delete when a similar survivor exists
+            has_similar = (
+                self._nearest_neighbor_similarities(ids, embeddings, candidates)
+                >= self.DELETE_SIMILARITY_THRESHOLD
+            )
+            to_delete = [ids[i] for i, similar in zip(candidates, has_similar) if similar]
         
         if to_delete:
             self.chroma.delete_memories(to_delete)
         
         return len(to_delete)
+    
+    def _nearest_neighbor_similarities(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        candidates: List[int]
+    ) -> np.ndarray:
+        """Get each candidate's similarity to its most similar other memory.
+        
+        Small collections use one exact GEMM. From ANN_MIN_MEMORIES on, each
+        candidate queries Chroma's HNSW index for its top two neighbors
+        (itself and the nearest other), which avoids the O(n^2) scan; a
+        missed neighbor only means a memory is kept.
+        
+        Args:
+            ids: List of memory IDs
+            embeddings: Embedding matrix, aligned with ids
+            candidates: Indices of the memories to check
+            
+        Returns:
+            Similarity per candidate, -inf when there is no other memory
+        """
+        if len(ids) < self.ANN_MIN_MEMORIES:
+            # Similarity of each candidate to every memory in one GEMM
+            similarities = embeddings[candidates] @ embeddings.T
+            similarities[np.arange(len(candidates)), candidates] = -np.inf
+            return similarities.max(axis=1)
+        
+        results = self.chroma.collection.query(
+            query_embeddings=embeddings[candidates],
+            n_results=2,
+            include=["distances"]
+        )
+        best = np.full(len(candidates), -np.inf, dtype=np.float32)
+        for row, (i, neighbor_ids, distances) in enumerate(
+            zip(candidates, results["ids"], results["distances"])
+        ):
+            others = [
+                distance for neighbor_id, distance in zip(neighbor_ids, distances)
+                if neighbor_id != ids[i]
+            ]
+            if others:
+                best[row] = self.chroma.distances_to_similarities(others[:1])[0]
+        return best
 
 
 # Global instance
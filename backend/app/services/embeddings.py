@@ -1,22 +1,109 @@
 """Embedding service using sentence-transformers."""
-from typing import List
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable, List
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from ..utils import normalize_embedding
+
+
+class BatchedEmbedder:
+    """Coalesces concurrent single-text embedding requests into batches.
+    
+    A background thread collects requests for up to `max_wait` seconds (or
+    until `max_batch` are waiting) and encodes them in one forward pass.
+    """
+    
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch: int = 32,
+        max_wait: float = 0.005
+    ):
+        """Start the batching thread.
+        
+        Args:
+            encode: Function embedding a list of texts, shape (len(texts), dimension)
+            max_batch: Max texts per forward pass
+            max_wait: Seconds to wait for more requests after the first arrives
+        """
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="batched-embedder", daemon=True)
+        self._thread.start()
+    
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a text as part of the next batch, blocking until it's done.
+        
+        Args:
+            text: Text string to embed
+            
+        Returns:
+            Numpy array embedding, shape (dimension,)
+        """
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+    
+    def _next_batch(self) -> list:
+        """Block for a request, then gather more until the batch is full or the wait ends."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        """Encode batches of queued requests forever."""
+        while True:
+            batch = self._next_batch()
+            try:
+                embeddings = self.encode([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
 
 class EmbeddingService:
     """Handles text embeddings using sentence-transformers."""
     
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(
+        self,
+        model_name: str = 'all-MiniLM-L6-v2',
+        query_cache_size: int = 4096,
+        backend: str = "torch"
+    ):
         """Initialize the embedding model.
         
         Args:
             model_name: Name of the sentence-transformers model
+            query_cache_size: Max number of query embeddings kept in the LRU cache
+            backend: Inference backend, "torch" or "onnx". ONNX Runtime with
+                graph optimizations is usually faster on CPU and needs the
+                `sentence-transformers[onnx]` extra
         """
-        print(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        print(f"Loading embedding model: {model_name} ({backend} backend)")
+        self.model = SentenceTransformer(model_name, backend=backend)
         self.dimension = self.model.get_sentence_embedding_dimension()
         print(f"Model loaded. Embedding dimension: {self.dimension}")
+        self._batcher = BatchedEmbedder(self.embed)
+        self._embed_query_cached = lru_cache(maxsize=query_cache_size)(self._embed_query)
     
     def embed(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for a list of texts.
@@ -41,13 +128,43 @@ class EmbeddingService:
     def embed_single(self, text: str) -> np.ndarray:
         """Generate embedding for a single text.
         
+        Concurrent calls are encoded together in one batch.
+        
         Args:
             text: Text string to embed
             
         Returns:
             Numpy array embedding, shape (dimension,)
         """
-        return self.embed([text])[0]
+        return self._batcher.embed(text)
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """Generate embedding for a query, reusing cached results.
+        
+        Repeated query strings skip the transformer forward pass.
+        
+        Args:
+            text: Query text to embed
+            
+        Returns:
+            Unit-length contiguous float32 embedding, shape (dimension,)
+        """
+        # Return a copy so callers can't mutate the cached array
+        return self._embed_query_cached(text).copy()
+    
+    def clear_query_cache(self):
+        """Drop all cached query embeddings."""
+        self._embed_query_cached.cache_clear()
+    
+    def _embed_query(self, text: str) -> np.ndarray:
+        """Embed a query and freeze the result for caching.
+        
+        Normalized once here, so downstream dot products need no
+        dtype conversion, copy or norm.
+        """
+        embedding = normalize_embedding(self.embed_single(text))
+        embedding.flags.writeable = False
+        return embedding
 
 
 # Global instance (singleton pattern)
@@ -58,5 +175,7 @@ def get_embedding_service() -> EmbeddingService:
     """Get or create the global embedding service instance."""
     global _embedding_service
     if _embedding_service is None:
-        _embedding_service = EmbeddingService()
+        _embedding_service = EmbeddingService(
+            backend=os.getenv("TRACEMIND_EMBEDDING_BACKEND", "torch")
+        )
     return _embedding_service
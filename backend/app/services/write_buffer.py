@@ -0,0 +1,105 @@
+"""Buffered memory writes for TraceMind."""
+import asyncio
+import uuid
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+
+class WriteBuffer:
+    """Coalesces single memory writes into batched ChromaDB adds.
+    
+    Writes are held in memory and flushed as one `add_memories` call when
+    the buffer fills up or the flush interval passes. Readers call `flush`
+    first so they always see their own writes.
+    """
+    
+    def __init__(
+        self,
+        chroma_service,
+        max_batch_size: int = 64,
+        flush_interval: float = 0.1
+    ):
+        """Initialize the write buffer.
+        
+        Args:
+            chroma_service: ChromaDB service instance
+            max_batch_size: Pending writes that trigger an immediate flush
+            flush_interval: Seconds between background flushes
+        """
+        self.chroma = chroma_service
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.running = False
+        self._pending: List[Tuple[str, str, np.ndarray, Dict[str, Any]]] = []
+        self._lock = asyncio.Lock()
+    
+    async def put(
+        self,
+        text: str,
+        embedding: np.ndarray,
+        metadata: Dict[str, Any]
+    ) -> str:
+        """Queue a memory for the next flush.
+        
+        Args:
+            text: Memory text content
+            embedding: Vector embedding
+            metadata: Metadata dict
+        
+        Returns:
+            UUID the memory will be stored under
+        """
+        memory_id = str(uuid.uuid4())
+        self._pending.append((memory_id, text, embedding, metadata))
+        
+        # Bound the buffer: a full batch is written before returning
+        if len(self._pending) >= self.max_batch_size:
+            await self.flush()
+        
+        return memory_id
+    
+    async def flush(self):
+        """Write all pending memories in one ChromaDB call."""
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            
+            ids, texts, embeddings, metadatas = zip(*batch)
+            try:
+                await asyncio.to_thread(
+                    self.chroma.add_memories,
+                    list(texts),
+                    np.stack(embeddings),
+                    list(metadatas),
+                    ids=list(ids)
+                )
+            except Exception:
+                # Keep the writes for the next flush
+                self._pending[:0] = batch
+                raise
+    
+    async def run(self):
+        """Flush pending writes every interval until cancelled."""
+        self.running = True
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Error flushing memory writes: {e}")
+        finally:
+            self.running = False
+
+
+# Global instance
+_write_buffer = None
+
+
+def get_write_buffer(chroma_service) -> WriteBuffer:
+    """Get or create the global write buffer instance."""
+    global _write_buffer
+    if _write_buffer is None:
+        _write_buffer = WriteBuffer(chroma_service)
+    return _write_buffer
@@ -1,9 +1,14 @@
 """Utility functions for TraceMind."""
-import json
 import os
+import threading
+import time
+import warnings
+from collections import OrderedDict, deque
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Hashable, Optional
 import numpy as np
+import orjson
 
 
 def get_utc_now() -> datetime:
@@ -16,8 +21,13 @@ def to_iso_string(dt: datetime) -> str:
     return dt.isoformat()
 
 
+@lru_cache(maxsize=4096)
 def from_iso_string(iso_str: str) -> datetime:
-    """Parse ISO8601 string to datetime."""
+    """Parse ISO8601 string to datetime.
+    
+    Results are cached: datetimes are immutable and the same stored
+    timestamps are parsed again on every compaction.
+    """
     # Handle both naive and aware timestamps
     try:
         dt = datetime.fromisoformat(iso_str.replace('Z', '+00:00'))
@@ -40,57 +50,294 @@ def calculate_age_days(timestamp_str: str) -> float:
     return (now - ts).total_seconds() / 86400.0
 
 
-def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    """Calculate cosine similarity between two vectors."""
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+def parse_timestamps(timestamp_strs: List[str]) -> np.ndarray:
+    """Parse many ISO timestamps to unix seconds in one array operation."""
+    try:
+        with warnings.catch_warnings():
+            # NumPy warns about UTC offsets but still converts them to UTC;
+            # naive timestamps are taken as UTC, matching from_iso_string
+            warnings.simplefilter("ignore")
+            timestamps = np.array(timestamp_strs, dtype="datetime64[us]")
+    except ValueError:
+        # Fallback for formats NumPy can't parse
+        return np.array(
+            [from_iso_string(ts).timestamp() for ts in timestamp_strs], dtype=np.float64
+        )
+    
+    return timestamps.astype(np.int64) / 1e6
+
+
+def calculate_ages_days(timestamp_strs: List[str]) -> np.ndarray:
+    """Calculate ages in days for many ISO timestamps in one array operation."""
+    return (get_utc_now().timestamp() - parse_timestamps(timestamp_strs)) / 86400.0
+
+
+def metadata_timestamps(metadatas: List[Dict[str, Any]]) -> np.ndarray:
+    """Get unix timestamps of memories from their metadata.
+    
+    Uses the `timestamp_epoch` stored at write time and only parses the ISO
+    `timestamp` of memories written before it existed.
+    """
+    epochs = np.array(
+        [meta.get("timestamp_epoch", np.nan) for meta in metadatas], dtype=np.float64
+    )
+    missing = np.flatnonzero(np.isnan(epochs))
+    if len(missing) > 0:
+        epochs[missing] = parse_timestamps([metadatas[i]["timestamp"] for i in missing])
+    return epochs
+
+
+def calculate_metadata_ages_days(metadatas: List[Dict[str, Any]]) -> np.ndarray:
+    """Calculate ages in days of memories from their metadata."""
+    return (get_utc_now().timestamp() - metadata_timestamps(metadatas)) / 86400.0
+
+
+def normalize_embedding(embedding: np.ndarray) -> np.ndarray:
+    """L2-normalize an embedding (or each row of a matrix) to unit length."""
+    embedding = np.asarray(embedding, dtype=np.float32)
+    # Squared norms via einsum skip the temporary squared copy that
+    # np.linalg.norm makes; then scale by the reciprocal square root
+    squared_norms = np.einsum('...i,...i->...', embedding, embedding)[..., np.newaxis]
+    return embedding * (1.0 / np.sqrt(np.maximum(squared_norms, 1e-24)))
 
 
 class MergeLogger:
-    """Logger for compaction merge events."""
+    """Logger for compaction merge events.
     
-    def __init__(self, log_file: str = "merge_log.json"):
+    Events are stored as JSON Lines, so logging one appends a single line
+    instead of rewriting the file. Parsed events are cached in memory and
+    reused while the file's stat signature is unchanged. When another
+    logger instance appends to the same file, only the new lines are
+    parsed; clearing replaces the file, which forces a full reload.
+    """
+    
+    def __init__(self, log_file: str = "merge_log.jsonl"):
         self.log_file = log_file
+        self._events: List[Dict[str, Any]] = []
+        self._signature: Optional[tuple] = None
+        self._offset = 0  # Bytes of the file parsed into _events
+        self._lock = threading.Lock()
+        self._migrate_legacy_log()
         self._ensure_log_file()
     
     def _ensure_log_file(self):
         """Create log file if it doesn't exist."""
         if not os.path.exists(self.log_file):
-            with open(self.log_file, 'w') as f:
-                json.dump([], f)
+            open(self.log_file, 'a').close()
+    
+    def _migrate_legacy_log(self):
+        """Convert a JSON array log next to this one (merge_log.json) to JSON Lines."""
+        legacy_file = os.path.splitext(self.log_file)[0] + ".json"
+        if legacy_file == self.log_file or not os.path.exists(legacy_file):
+            return
+        if os.path.exists(self.log_file):
+            return
+        
+        try:
+            with open(legacy_file, 'rb') as f:
+                events = orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            events = []
+        with open(self.log_file, 'wb') as f:
+            f.writelines(orjson.dumps(event) + b'\n' for event in events)
+        os.replace(legacy_file, legacy_file + ".migrated")
     
     def log_merge(self, event: Dict[str, Any]):
         """Append a merge event to the log."""
-        events = self.read_log()
-        events.append(event)
-        with open(self.log_file, 'w') as f:
-            json.dump(events, f, indent=2)
+        with self._lock:
+            events = self._load_events()
+            line = orjson.dumps(event) + b'\n'
+            with open(self.log_file, 'ab') as f:
+                f.write(line)
+            events.append(event)
+            self._offset += len(line)
+            self._signature = self._stat_signature()
     
     def read_log(self) -> List[Dict[str, Any]]:
         """Read all merge events."""
-        try:
-            with open(self.log_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        with self._lock:
+            return list(self._load_events())
+    
+    def read_tail(self, limit: int) -> List[Dict[str, Any]]:
+        """Read the most recent `limit` merge events, oldest first."""
+        with self._lock:
+            return self._load_events()[-limit:] if limit > 0 else []
     
     def get_total_merges(self) -> int:
         """Get total number of merge events."""
-        return len(self.read_log())
+        with self._lock:
+            return len(self._load_events())
     
     def clear_log(self):
         """Clear the merge log."""
-        with open(self.log_file, 'w') as f:
-            json.dump([], f)
+        with self._lock:
+            # Replace rather than truncate, so other instances see a new inode
+            tmp_file = self.log_file + ".tmp"
+            open(tmp_file, 'w').close()
+            os.replace(tmp_file, self.log_file)
+            self._events = []
+            self._offset = 0
+            self._signature = self._stat_signature()
+    
+    def _stat_signature(self) -> Optional[tuple]:
+        """Get a signature that changes whenever the log file is written."""
+        try:
+            stat = os.stat(self.log_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    
+    def _load_events(self) -> List[Dict[str, Any]]:
+        """Get parsed events, reading only what changed in the file."""
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return self._events
+        
+        appended = (
+            signature is not None
+            and self._signature is not None
+            and signature[0] == self._signature[0]
+            and signature[1] >= self._offset
+        )
+        if not appended:
+            self._events = []
+            self._offset = 0
+        
+        try:
+            with open(self.log_file, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        
+        # Leave a partially written last line for the next read
+        *lines, partial = data.split(b'\n')
+        for line in lines:
+            try:
+                self._events.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                # Skip blank or corrupt lines
+                continue
+        self._offset += len(data) - len(partial)
+        self._signature = signature
+        return self._events
+
+
+class ResponseCache:
+    """Short-lived in-memory cache for read-only endpoint responses."""
+    
+    def __init__(self, max_entries: int = 256):
+        """Initialize the cache.
+        
+        Args:
+            max_entries: Max number of cached responses before evicting the oldest
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached response, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """Cache a response for `ttl` seconds."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SemanticCache:
+    """Cache of recent recall results, matched by query-embedding similarity.
+    
+    A query whose embedding is close enough to a recent query with the same
+    parameters is served the earlier results without touching ChromaDB.
+    Query embeddings must be unit-length float32, as returned by
+    `EmbeddingService.embed_query`.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 256,
+        similarity_threshold: float = 0.97,
+        ttl: float = 60.0
+    ):
+        """Initialize the cache.
+        
+        Args:
+            max_entries: Max number of recent queries kept
+            similarity_threshold: Min cosine similarity to count as a hit
+            ttl: Seconds before an entry expires, so decayed scores stay fresh
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self._entries: deque = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+    
+    def get(self, query_embedding: np.ndarray, params: Hashable) -> Optional[Any]:
+        """Get cached results for a similar query with the same params, or None."""
+        with self._lock:
+            self._evict_expired()
+            candidates = [entry for entry in self._entries if entry[1] == params]
+            if not candidates:
+                return None
+            
+            recent = np.stack([entry[0] for entry in candidates])
+            sims = recent @ query_embedding
+            best = int(np.argmax(sims))
+            if sims[best] >= self.similarity_threshold:
+                return candidates[best][2]
+            return None
+    
+    def add(self, query_embedding: np.ndarray, params: Hashable, results: Any):
+        """Cache results for a query."""
+        with self._lock:
+            self._entries.append((query_embedding, params, results, time.monotonic()))
+    
+    def clear(self):
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+    
+    def _evict_expired(self):
+        """Drop entries older than the TTL (entries are in insertion order)."""
+        cutoff = time.monotonic() - self.ttl
+        while self._entries and self._entries[0][3] < cutoff:
+            self._entries.popleft()
 
 
 def create_metadata(
     importance: float = 0.5,
     topic: Optional[str] = None,
-    source: str = "manual"
+    source: str = "manual",
+    timestamp: Optional[datetime] = None
 ) -> Dict[str, Any]:
-    """Create metadata dict for ChromaDB storage."""
+    """Create metadata dict for ChromaDB storage.
+    
+    The timestamp is stored both as an ISO string and as unix seconds
+    (`timestamp_epoch`), so ages can be computed without parsing.
+    """
+    if timestamp is None:
+        timestamp = get_utc_now()
     metadata = {
-        "timestamp": to_iso_string(get_utc_now()),
+        "timestamp": to_iso_string(timestamp),
+        "timestamp_epoch": timestamp.timestamp(),
         "importance": float(importance),
         "source": source,
         "merge_count": 0
@@ -0,0 +1,29 @@
+"""Shared pytest configuration for the TraceMind backend tests."""
+import os
+import shutil
+import tempfile
+
+# Working directory of this pytest-xdist worker, if it was given one
+_worker_dir = None
+
+
+def pytest_configure(config):
+    """Give each pytest-xdist worker its own working directory.
+    
+    The app keeps its ChromaDB directory and merge log relative to the
+    working directory, so workers sharing one would clear and overwrite
+    each other's memories. Test paths are resolved against the invocation
+    directory, so collection is unaffected.
+    """
+    global _worker_dir
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+    if worker_id:
+        _worker_dir = tempfile.mkdtemp(prefix=f"tracemind-{worker_id}-")
+        os.chdir(_worker_dir)
+
+
+def pytest_unconfigure(config):
+    """Remove this worker's working directory."""
+    if _worker_dir:
+        os.chdir(config.invocation_params.dir)
+        shutil.rmtree(_worker_dir, ignore_errors=True)
@@ -3,15 +3,36 @@ import pytest
 from fastapi.testclient import TestClient
 import sys
 import os
+import asyncio
+import threading
+import chromadb
+from chromadb.config import Settings
+import numpy as np
+from datetime import datetime, timedelta, timezone
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.main import app
-from app.services.chroma_client import get_chroma_service
+from app.api import routes
+from app.services.chroma_client import ChromaService, get_chroma_service
+from app.services.compaction import get_compaction_service
+from app.services.embeddings import BatchedEmbedder, get_embedding_service
+from app.services.write_buffer import WriteBuffer
+from app.utils import (
+    MergeLogger,
+    ResponseCache,
+    SemanticCache,
+    calculate_metadata_ages_days,
+    create_metadata,
+    normalize_embedding
+)
 
 client = TestClient(app)
 
+# Clients opened on the same path in one process must share settings
+CHROMA_SETTINGS = Settings(anonymized_telemetry=False)
+
 
 @pytest.fixture(autouse=True)
 def setup_and_teardown():
@@ -77,6 +98,96 @@ def test_remember_invalid():
     assert response.status_code == 422  # Validation error
 
 
+def test_remember_sync():
+    """Test storing a memory that is written before the response."""
+    response = client.post("/api/remember/sync", json={"text": "Durable memory"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "stored"
+    assert get_chroma_service().count() == 1
+
+
+def test_reads_survive_failed_flush(monkeypatch):
+    """Test that read endpoints still answer when queued writes can't be flushed."""
+    routes.init_services()
+    
+    async def failing_flush():
+        raise RuntimeError("ChromaDB unavailable")
+    
+    monkeypatch.setattr(routes.write_buffer, "flush", failing_flush)
+    assert client.get("/api/stats").status_code == 200
+    assert client.get("/api/recall", params={"q": "anything"}).status_code == 200
+
+
+def test_write_buffer_batches_writes(tmp_path):
+    """Test that buffered writes are stored in batches and flushed on demand."""
+    chroma = ChromaService(persist_directory=str(tmp_path))
+    calls = []
+    add_memories = chroma.add_memories
+    
+    def counting_add_memories(*args, **kwargs):
+        calls.append(len(args[0]))
+        return add_memories(*args, **kwargs)
+    
+    chroma.add_memories = counting_add_memories
+    buffer = WriteBuffer(chroma, max_batch_size=3)
+    embedding = normalize_embedding(np.ones(8))
+    
+    async def write(n):
+        return [await buffer.put(f"memory {i}", embedding, create_metadata()) for i in range(n)]
+    
+    # A full buffer is written before put returns
+    ids = asyncio.run(write(4))
+    assert calls == [3]
+    assert chroma.count() == 3
+    
+    # The remainder is written by an explicit flush, under the returned IDs
+    asyncio.run(buffer.flush())
+    assert calls == [3, 1]
+    assert set(chroma.collection.get()["ids"]) == set(ids)
+
+
+def test_batched_embedder_coalesces_requests():
+    """Test that concurrent single-text requests share one encode call."""
+    batch_sizes = []
+    
+    def encode(texts):
+        batch_sizes.append(len(texts))
+        return np.array([[len(text), 1.0] for text in texts])
+    
+    embedder = BatchedEmbedder(encode, max_batch=8, max_wait=0.2)
+    texts = ["a" * i for i in range(1, 9)]
+    results = {}
+    
+    def embed(text):
+        results[text] = embedder.embed(text)
+    
+    threads = [threading.Thread(target=embed, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sum(batch_sizes) == 8
+    assert len(batch_sizes) < 8
+    assert all(results[text][0] == len(text) for text in texts)
+
+
+def test_remember_batch():
+    """Test storing several memories in one request."""
+    payload = [
+        {"text": "Python is a programming language", "topic": "programming"},
+        {"text": "The Eiffel Tower is in Paris", "importance": 0.9}
+    ]
+    
+    response = client.post("/api/remember/batch", json=payload)
+    assert response.status_code == 200
+    
+    data = response.json()
+    assert len(data) == 2
+    assert all(item["status"] == "stored" for item in data)
+    assert len({item["id"] for item in data}) == 2
+
+
 def test_recall_memories():
     """Test recalling memories."""
     # First, store some memories
@@ -124,6 +235,48 @@ def test_recall_with_topic_filter():
         assert result["metadata"].get("topic") == "ML"
 
 
+def test_recall_semantic_cache(monkeypatch):
+    """Test that repeated recalls are served without querying ChromaDB."""
+    client.post("/api/remember", json={"text": "Paris is the capital of France"})
+    
+    chroma = get_chroma_service()
+    calls = []
+    query_memories = chroma.query_memories
+    
+    def counting_query(*args, **kwargs):
+        calls.append(kwargs)
+        return query_memories(*args, **kwargs)
+    
+    monkeypatch.setattr(chroma, "query_memories", counting_query)
+    params = {"q": "capital of France", "k": 3}
+    
+    first = client.get("/api/recall", params=params).json()
+    assert client.get("/api/recall", params=params).json() == first
+    assert len(calls) == 1
+    
+    # Different parameters miss the cache
+    client.get("/api/recall", params={**params, "k": 2})
+    client.get("/api/recall", params={**params, "decay": False})
+    assert len(calls) == 3
+    
+    # New memories invalidate cached results
+    client.post("/api/remember", json={"text": "France is in Europe"})
+    client.get("/api/recall", params=params)
+    assert len(calls) == 4
+
+
+def test_semantic_cache_near_duplicate():
+    """Test that a near-duplicate query embedding is a cache hit."""
+    cache = SemanticCache(similarity_threshold=0.97)
+    query = normalize_embedding(np.random.default_rng(0).normal(size=16))
+    cache.add(query, ("params",), ["result"])
+    
+    near = normalize_embedding(query + np.float32(0.01))
+    assert cache.get(near, ("params",)) == ["result"]
+    assert cache.get(near, ("other",)) is None
+    assert cache.get(-query, ("params",)) is None
+
+
 def test_list_collections():
     """Test listing ChromaDB collections."""
     response = client.get("/api/collections")
@@ -183,6 +336,187 @@ def test_compaction():
     assert data["after_count"] <= data["before_count"]
 
 
+def test_build_clusters_single_linkage(monkeypatch):
+    """Test that chains of similar memories form one capped cluster."""
+    chroma = get_chroma_service()
+    # Neighbours along the chain are 20 degrees apart (cosine ~0.94), the
+    # ends 40 degrees apart (cosine ~0.77); the last memory is unrelated
+    angles = np.radians([0.0, 20.0, 40.0, 90.0])
+    embeddings = np.stack([np.cos(angles), np.sin(angles), np.zeros(4)], axis=1)
+    metadatas = [create_metadata() for _ in angles]
+    documents = ["a", "b", "c", "d"]
+    ids = chroma.add_memories(documents, embeddings, metadatas)
+    
+    compaction = get_compaction_service(chroma, get_embedding_service())
+    clusters = compaction._build_clusters(ids, embeddings, documents, metadatas)
+    assert len(clusters) == 1
+    assert clusters[0]["ids"] == ids[:3]
+    assert clusters[0]["documents"] == ["a", "b", "c"]
+    
+    # Oversized chains are split keeping the members closest to the first
+    # together, so "a" is merged with its neighbour "b", not with "c"
+    monkeypatch.setattr(compaction, "MAX_CLUSTER_SIZE", 2)
+    order = [0, 2, 1, 3]
+    clusters = compaction._build_clusters(
+        [ids[i] for i in order],
+        embeddings[order],
+        [documents[i] for i in order],
+        [metadatas[i] for i in order]
+    )
+    assert [cluster["documents"] for cluster in clusters] == [["a", "b"]]
+    
+    # Splitting a star keeps each chunk linked above the threshold: the
+    # two arms' tips "d" and "e" (cosine 0.5) are never merged together
+    angles = np.radians([0.0, 20.0, -20.0, 40.0, -40.0])
+    embeddings = np.stack([np.cos(angles), np.sin(angles), np.zeros(5)], axis=1)
+    metadatas = [create_metadata() for _ in angles]
+    documents = ["a", "b", "c", "d", "e"]
+    ids = chroma.add_memories(documents, embeddings, metadatas)
+    clusters = compaction._build_clusters(ids, embeddings, documents, metadatas)
+    assert [cluster["documents"] for cluster in clusters] == [["a", "b"], ["c", "e"]]
+    for cluster in clusters:
+        similarity = cluster["embeddings"][0] @ cluster["embeddings"][1]
+        assert similarity >= compaction.SIM_THRESHOLD
+
+
+def test_merge_cluster_weighted_centroid():
+    """Test that a merged memory stores the normalized weighted centroid."""
+    chroma = get_chroma_service()
+    embeddings = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], dtype=np.float32)
+    metadatas = [create_metadata(importance=0.9), create_metadata(importance=0.3)]
+    ids = chroma.add_memories(["first", "second"], embeddings, metadatas)
+    
+    compaction = get_compaction_service(chroma, get_embedding_service())
+    [new_id] = compaction._merge_clusters([{
+        "ids": ids,
+        "embeddings": embeddings,
+        "documents": ["first", "second"],
+        "metadatas": metadatas,
+        "timestamps": np.array([meta["timestamp_epoch"] for meta in metadatas])
+    }])
+    
+    stored = chroma.collection.get(ids=[new_id], include=["embeddings", "metadatas"])
+    expected = normalize_embedding(np.array([0.9, 0.3, 0.0]))
+    np.testing.assert_allclose(stored["embeddings"][0], expected, atol=1e-3)
+    assert stored["metadatas"][0]["merge_count"] == 1
+    assert chroma.count() == 1
+
+
+def test_compaction_counts_match_collection(monkeypatch):
+    """Test that computed compaction counts match the stored collection."""
+    chroma = get_chroma_service()
+    old = (datetime.now(timezone.utc) - timedelta(days=60)).isoformat()
+    embeddings = np.array([
+        [1.0, 0.0, 0.0],
+        [0.99, 0.05, 0.0],
+        [0.0, 1.0, 0.0],
+        [0.0, 0.9, 0.45]
+    ])
+    metadatas = [
+        {"timestamp": old, "importance": 0.1},
+        {"timestamp": old, "importance": 0.1},
+        {"timestamp": old, "importance": 0.9},
+        {"timestamp": old, "importance": 0.1}
+    ]
+    chroma.add_memories(["a", "a2", "b", "b-ish"], embeddings, metadatas)
+    
+    compaction = get_compaction_service(chroma, get_embedding_service())
+    stats = compaction.run_compaction()
+    
+    assert stats["before_count"] == 4
+    assert stats["clusters_merged"] == 1
+    assert stats["items_deleted"] == 1
+    assert stats["after_count"] == chroma.count() == 2
+
+
+@pytest.mark.parametrize("ann_min_memories", [5000, 0], ids=["exact", "hnsw"])
+def test_compaction_deletes_old_redundant_memories(monkeypatch, ann_min_memories):
+    """Test that old, unimportant memories with a similar survivor are deleted."""
+    chroma = get_chroma_service()
+    embeddings = np.array([[1.0, 0.0, 0.0], [0.99, 0.1, 0.0], [0.0, 1.0, 0.0]])
+    old = (datetime.now(timezone.utc) - timedelta(days=60)).isoformat()
+    metadatas = [
+        {"timestamp": old, "importance": 0.1},
+        {"timestamp": old, "importance": 0.9},
+        {"timestamp": old, "importance": 0.1}
+    ]
+    ids = chroma.add_memories(["dup", "survivor", "unique"], embeddings, metadatas)
+    
+    compaction = get_compaction_service(chroma, get_embedding_service())
+    monkeypatch.setattr(compaction, "ANN_MIN_MEMORIES", ann_min_memories)
+    deleted = compaction._delete_redundant_memories(chroma.get_all_memories())
+    
+    assert deleted == 1
+    assert set(chroma.collection.get()["ids"]) == set(ids[1:])
+
+
+@pytest.mark.parametrize("ann_min_memories", [5000, 0], ids=["exact", "hnsw"])
+def test_compaction_deletes_before_merging(monkeypatch, ann_min_memories):
+    """Test that deletion neighbors are found before merges on both search paths."""
+    chroma = get_chroma_service()
+    # "old" (0 degrees) is redundant with "near" (25 degrees, cosine ~0.91),
+    # which merges with "far" (45 degrees) into a centroid that "old" is no
+    # longer similar enough to
+    angles = np.radians([0.0, 25.0, 45.0])
+    embeddings = np.stack([np.cos(angles), np.sin(angles), np.zeros(3)], axis=1)
+    old = (datetime.now(timezone.utc) - timedelta(days=60)).isoformat()
+    metadatas = [{"timestamp": old, "importance": 0.1}, create_metadata(), create_metadata()]
+    chroma.add_memories(["old", "near", "far"], embeddings, metadatas)
+    
+    compaction = get_compaction_service(chroma, get_embedding_service())
+    monkeypatch.setattr(compaction, "ANN_MIN_MEMORIES", ann_min_memories)
+    stats = compaction.run_compaction()
+    
+    assert stats["items_deleted"] == 1
+    assert stats["clusters_merged"] == 1
+    assert chroma.count() == stats["after_count"] == 1
+
+
+def test_legacy_embeddings_normalized(tmp_path, monkeypatch):
+    """Test that a collection created before normalization is migrated."""
+    monkeypatch.setattr(ChromaService, "MIGRATION_BATCH_SIZE", 2)
+    legacy_client = chromadb.PersistentClient(path=str(tmp_path), settings=CHROMA_SETTINGS)
+    legacy = legacy_client.create_collection("memories")
+    embeddings = np.random.default_rng(0).normal(size=(5, 8)).astype(np.float32) * 3
+    legacy.add(
+        ids=[f"m{i}" for i in range(5)],
+        embeddings=embeddings,
+        documents=[f"Memory {i}" for i in range(5)]
+    )
+    
+    chroma = ChromaService(persist_directory=str(tmp_path))
+    assert chroma.collection.metadata["embeddings_normalized"] is True
+    
+    stored = chroma.collection.get(include=["embeddings"])["embeddings"]
+    assert np.linalg.norm(stored, axis=1) == pytest.approx(np.ones(5), abs=1e-5)
+
+
+@pytest.mark.parametrize("space", ["l2", "cosine"])
+def test_distances_to_similarities(tmp_path, space):
+    """Test that distance-derived similarities equal exact cosine similarities."""
+    chromadb.PersistentClient(path=str(tmp_path), settings=CHROMA_SETTINGS).create_collection(
+        "memories",
+        metadata={"embeddings_normalized": True, "hnsw:space": space}
+    )
+    chroma = ChromaService(persist_directory=str(tmp_path))
+    
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(6, 8)).astype(np.float32)
+    chroma.add_memories(
+        [f"Memory {i}" for i in range(6)],
+        embeddings,
+        [create_metadata() for _ in range(6)]
+    )
+    
+    query = rng.normal(size=8).astype(np.float32)
+    results = chroma.query_memories(
+        query, n_results=6, include=["distances", "embeddings"]
+    )
+    expected = np.asarray(results["embeddings"][0]) @ (query / np.linalg.norm(query))
+    similarities = chroma.distances_to_similarities(results["distances"][0])
+    assert similarities == pytest.approx(expected, abs=1e-4)
+
+
 def test_get_stats():
     """Test getting system statistics."""
     # Store some memories
@@ -200,6 +534,68 @@ def test_get_stats():
     assert stats["total_memories"] >= 2
 
 
+def test_stats_summary_tracks_writes():
+    """Test that running stats aggregates match a full collection scan."""
+    chroma = get_chroma_service()
+    
+    def assert_matches_scan():
+        metadatas = chroma.collection.get(include=["metadatas"])["metadatas"]
+        summary = chroma.get_stats_summary()
+        assert summary["total_memories"] == len(metadatas)
+        expected_topics = {}
+        for meta in metadatas:
+            topic = meta.get("topic", "untagged")
+            expected_topics[topic] = expected_topics.get(topic, 0) + 1
+        assert summary["topics"] == expected_topics
+        return summary
+    
+    assert assert_matches_scan()["total_memories"] == 0
+    
+    client.post("/api/remember", json={"text": "The cat sat on the mat", "topic": "pets"})
+    client.post("/api/remember", json={"text": "The cat sat on the mat.", "topic": "pets"})
+    client.post("/api/remember", json={"text": "Rust has no garbage collector", "topic": "code"})
+    summary = assert_matches_scan()
+    assert summary["topics"] == {"pets": 2, "code": 1}
+    assert summary["average_age_days"] == pytest.approx(0.0, abs=0.01)
+    
+    # Compaction adds a merged memory and deletes the originals
+    client.post("/api/compact")
+    assert assert_matches_scan()["total_memories"] == 2
+    
+    chroma.clear_collection()
+    assert assert_matches_scan()["total_memories"] == 0
+
+
+def test_stats_cache_invalidation():
+    """Test that cached stats are dropped when memories change."""
+    assert client.get("/api/stats").json()["total_memories"] == 0
+    
+    client.post("/api/remember", json={"text": "Cached stats memory"})
+    assert client.get("/api/stats").json()["total_memories"] == 1
+    
+    client.post("/api/compact")
+    assert client.get("/api/stats").json()["total_memories"] == 1
+    
+    get_chroma_service().clear_collection()
+    assert client.get("/api/stats").json()["total_memories"] == 0
+
+
+def test_response_cache():
+    """Test response cache expiry and clearing."""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("expired", 2, ttl=-1)
+    assert cache.get("a") == 1
+    assert cache.get("expired") is None
+    
+    cache.set("b", 3, ttl=60)
+    cache.set("c", 4, ttl=60)
+    assert cache.get("a") is None  # Evicted as least recently used
+    
+    cache.clear()
+    assert cache.get("c") is None
+
+
 def test_umap_projection():
     """Test UMAP projection endpoint."""
     # Store enough memories for projection
@@ -220,6 +616,19 @@ def test_umap_projection():
         assert "document" in point
 
 
+def test_projection_point():
+    """Test fetching the full document of a projected memory."""
+    text = "A long memory " * 20
+    memory_id = client.post("/api/remember", json={"text": text}).json()["id"]
+    
+    response = client.get(f"/api/dashboard/point/{memory_id}")
+    assert response.status_code == 200
+    assert response.json()["document"] == text
+    
+    response = client.get("/api/dashboard/point/missing-id")
+    assert response.status_code == 404
+
+
 def test_compaction_log():
     """Test compaction log endpoint."""
     response = client.get("/api/dashboard/compaction-log?limit=10")
@@ -231,5 +640,64 @@ def test_compaction_log():
     assert isinstance(data["events"], list)
 
 
+def test_metadata_ages_without_epoch():
+    """Test that legacy metadata without timestamp_epoch gets the same age."""
+    metadata = create_metadata(timestamp=datetime.now(timezone.utc) - timedelta(days=3))
+    legacy = {key: value for key, value in metadata.items() if key != "timestamp_epoch"}
+    
+    ages = calculate_metadata_ages_days([metadata, legacy])
+    assert ages[0] == pytest.approx(3.0, abs=1e-3)
+    assert ages[1] == pytest.approx(ages[0], abs=1e-6)
+
+
+def test_merge_logger_tail(tmp_path):
+    """Test that merge log reads see writes from other logger instances."""
+    log_file = str(tmp_path / "merge_log.jsonl")
+    reader = MergeLogger(log_file)
+    writer = MergeLogger(log_file)
+    assert reader.read_tail(5) == []
+    
+    for i in range(3):
+        writer.log_merge({"timestamp": f"t{i}"})
+    
+    assert reader.get_total_merges() == 3
+    assert reader.read_tail(2) == [{"timestamp": "t1"}, {"timestamp": "t2"}]
+    
+    # Appends from another instance are parsed incrementally
+    writer.log_merge({"timestamp": "t3"})
+    assert reader.get_total_merges() == 4
+    assert reader.read_tail(1) == [{"timestamp": "t3"}]
+    
+    writer.clear_log()
+    assert reader.get_total_merges() == 0
+
+
+def test_merge_logger_migrates_json_array(tmp_path):
+    """Test that a legacy JSON array log is converted to JSON Lines."""
+    legacy_file = tmp_path / "merge_log.json"
+    legacy_file.write_text('[{"timestamp": "t0"}, {"timestamp": "t1"}]')
+    
+    logger = MergeLogger(str(tmp_path / "merge_log.jsonl"))
+    logger.log_merge({"timestamp": "t2"})
+    
+    assert logger.read_log() == [{"timestamp": f"t{i}"} for i in range(3)]
+    assert len((tmp_path / "merge_log.jsonl").read_text().splitlines()) == 3
+    assert not legacy_file.exists()
+
+
+def test_clear_cache():
+    """Test clearing the query embedding cache."""
+    embedding_service = get_embedding_service()
+    embedding_service.embed_query("cached query")
+    hits = embedding_service._embed_query_cached.cache_info().hits
+    embedding_service.embed_query("cached query")
+    assert embedding_service._embed_query_cached.cache_info().hits == hits + 1
+    
+    response = client.post("/api/cache/clear")
+    assert response.status_code == 200
+    assert response.json()["status"] == "cleared"
+    assert embedding_service._embed_query_cached.cache_info().currsize == 0
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -205,12 +205,21 @@ function Dashboard() {
           displaylogo: false
         }}
         style={{ width: '100%' }}
-        onClick={(data) => {
+        onClick={async (data) => {
           if (data.points && data.points.length > 0) {
             const pointIndex = data.points[0].pointIndex
             const topic = data.points[0].data.name
             const topicPoints = points.filter(p => (p.metadata.topic || 'untagged') === topic)
-            setSelectedPoint(topicPoints[pointIndex])
+            const point = topicPoints[pointIndex]
+            setSelectedPoint(point)
+
+            // Projection points only carry a preview, fetch the full document
+            try {
+              const pointRes = await axios.get(`/api/dashboard/point/${point.id}`)
+              setSelectedPoint({ ...point, document: pointRes.data.document })
+            } catch (err) {
+              console.error('Error loading memory:', err)
+            }
           }
         }}
       />
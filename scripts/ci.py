@@ -0,0 +1,23 @@
+"""Run the test suite and setup verification together."""
+import subprocess
+import sys
+from pathlib import Path
+
+import verify_setup
+
+def main():
+    """Run tests in a subprocess while verifying the setup in this one.
+    
+    The test suite is CPU-bound and verification is I/O-bound, so
+    verification finishes while the tests are still running.
+    """
+    tests = subprocess.Popen([sys.executable, str(Path(__file__).parent / "run_tests.py")])
+    
+    verify_ok = verify_setup.main()
+    tests_code = tests.wait()
+    
+    # A negative code means the test run was killed by a signal
+    sys.exit(1 if tests_code != 0 or not verify_ok else 0)
+
+if __name__ == "__main__":
+    main()
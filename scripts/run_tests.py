@@ -1,6 +1,78 @@
 """Run all tests with coverage reporting."""
+import os
 import subprocess
 import sys
+from collections import deque
+import pytest
+
+# pytest's exit code when a marker selects no tests
+NO_TESTS_COLLECTED = 5
+
+def pytest_workers():
+    """Number of xdist workers, leaving two cores free unless overridden."""
+    return os.getenv("TRACEMIND_PYTEST_WORKERS") or str(max(1, (os.cpu_count() or 1) - 2))
+
+def run_pytest(*args):
+    """Run pytest on the backend tests in this process and return its exit code."""
+    return int(pytest.main(["tests/", "-q", "--no-header", "--tb=short", *args]))
+
+def run_pytest_isolated(*args):
+    """Run pytest on the backend tests in a fresh interpreter and return its exit code.
+    
+    Output is streamed through a pipe and summarized: FAILED/ERROR lines as
+    they arrive, then the final summary line, or the last lines of output
+    if the run failed.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "pytest", "tests/", "-q", "--no-header", "--tb=short", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1
+    )
+    tail = deque(maxlen=40)
+    for line in process.stdout:
+        if line.startswith(("FAILED", "ERROR")):
+            sys.stdout.write(line)
+        tail.append(line)
+    returncode = process.wait()
+    
+    if returncode in (0, NO_TESTS_COLLECTED):
+        sys.stdout.writelines(list(tail)[-1:])
+    else:
+        sys.stdout.writelines(tail)
+    return returncode
+
+def collect_tests(*args):
+    """Collect the backend tests without running them.
+    
+    Import errors in tests or conftest show up here once, before they can
+    break every xdist worker separately.
+    
+    Returns:
+        pytest's exit code and the number of tests selected by args
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "tests/", "--collect-only", "-q", *args],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode not in (0, NO_TESTS_COLLECTED):
+        sys.stdout.write(result.stdout)
+        sys.stdout.write(result.stderr)
+    # -q lists one node ID per selected test
+    selected = sum("::" in line for line in result.stdout.splitlines())
+    return result.returncode, selected
+
+def rerun_failed_verbose(*args):
+    """Re-run the tests that failed last time with verbose output."""
+    print("\nRe-running failed tests verbosely...\n")
+    subprocess.run(
+        [
+            sys.executable, "-m", "pytest", "tests/",
+            "--last-failed", "--lfnf=none", "-v", "--tb=short", *args
+        ]
+    )
 
 def run_tests():
     """Run pytest with coverage."""
@@ -9,13 +81,32 @@ def run_tests():
     print("=" * 60)
     print()
     
-    # Run pytest
-    result = subprocess.run(
-        [sys.executable, "-m", "pytest", "tests/", "-v", "--tb=short"],
-        cwd="backend"
+    os.chdir("backend")
+    
+    # Fail fast on import errors before starting the workers; collecting
+    # with the subprocess marker also tells whether the serial pass has work
+    collect_code, serial_count = collect_tests("-m", "subprocess")
+    if collect_code not in (0, NO_TESTS_COLLECTED):
+        print("\n" + "=" * 60)
+        print("  ❌ Test collection failed")
+        print("=" * 60)
+        sys.exit(1)
+    
+    # Run pytest across xdist workers, each with its own ChromaDB directory
+    # (see tests/conftest.py); loadgroup keeps tests marked with the same
+    # xdist_group on one worker
+    parallel_code = run_pytest(
+        "-n", pytest_workers(), "--dist=loadgroup", "-m", "not subprocess"
     )
+    if parallel_code == pytest.ExitCode.TESTS_FAILED:
+        rerun_failed_verbose("-m", "not subprocess")
+    
+    # Tests that spawn processes run serially so they don't starve the pool,
+    # in their own interpreter so they don't inherit this one's state. When
+    # no test is marked, skip the pass and its heavy imports entirely
+    serial_code = run_pytest_isolated("-m", "subprocess") if serial_count else 0
     
-    if result.returncode == 0:
+    if all(code in (0, NO_TESTS_COLLECTED) for code in (parallel_code, serial_code)):
         print("\n" + "=" * 60)
         print("  ✅ All tests passed!")
         print("=" * 60)
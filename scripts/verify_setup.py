@@ -1,67 +1,158 @@
 """Verify TraceMind installation and setup."""
+import importlib.util
+import json
 import os
+import time
+from functools import lru_cache
 import sys
-import subprocess
-from pathlib import Path
+
+# Files the project structure check expects, with descriptions
+STRUCTURE_CHECKS = (
+    ("backend/app/main.py", "Backend main application"),
+    ("backend/app/api/routes.py", "API routes"),
+    ("backend/app/services/embeddings.py", "Embeddings service"),
+    ("backend/app/services/chroma_client.py", "ChromaDB client"),
+    ("backend/app/services/compaction.py", "Compaction service"),
+    ("backend/requirements.txt", "Python requirements"),
+    ("frontend/package.json", "Frontend package.json"),
+    ("frontend/src/App.jsx", "Frontend App component"),
+    ("frontend/src/pages/Remember.jsx", "Remember page"),
+    ("frontend/src/pages/Recall.jsx", "Recall page"),
+    ("frontend/src/pages/Dashboard.jsx", "Dashboard page"),
+    ("scripts/populate_demo.py", "Demo script"),
+    ("README.md", "README documentation"),
+)
 
 def print_header(text):
-    """Print section header."""
+    """Print section header, writing out the previous section first."""
+    sys.stdout.flush()
     print(f"\n{'='*60}")
     print(f"  {text}")
     print('='*60)
 
+@lru_cache(maxsize=32)
+def list_directory(parent):
+    """Get a directory's entries by name, listing each directory only once."""
+    try:
+        with os.scandir(parent) as entries:
+            return {entry.name: entry for entry in entries}
+    except FileNotFoundError:
+        return {}
+
 def check_file(path, description):
-    """Check if file exists."""
-    if Path(path).exists():
+    """Check if file exists by looking it up in its directory's listing."""
+    parent, name = os.path.split(path)
+    if name in list_directory(parent or "."):
         print(f"  ✅ {description}")
         return True
     else:
         print(f"  ❌ {description} - NOT FOUND")
         return False
 
+def check_directory(path):
+    """Check if a directory exists, using the file type from its parent's listing.
+    
+    DirEntry reads the type scandir already fetched, so no extra stat is
+    needed. Like os.path.lexists, a symlink counts without being resolved:
+    pnpm/yarn workspaces often symlink node_modules, and following it would
+    cost a stat per check.
+    """
+    parent, name = os.path.split(path)
+    entry = list_directory(parent or ".").get(name)
+    return entry is not None and (entry.is_symlink() or entry.is_dir(follow_symlinks=False))
+
+# pip distribution names of packages whose import name differs
+DISTRIBUTION_NAMES = {
+    'sentence_transformers': 'sentence-transformers',
+    'sklearn': 'scikit-learn',
+    'umap': 'umap-learn',
+}
+
+# Packages found missing are remembered here, and not looked up again
+# for NEGATIVE_CACHE_TTL seconds
+NEGATIVE_CACHE_FILE = os.path.join(
+    os.path.expanduser("~"), ".cache", "tracemind", "verify_neg.json"
+)
+NEGATIVE_CACHE_TTL = 60
+
+def load_negative_cache():
+    """Get when each known-missing package was last found missing."""
+    try:
+        with open(NEGATIVE_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_negative_cache(cache):
+    """Store the known-missing packages (best effort)."""
+    try:
+        os.makedirs(os.path.dirname(NEGATIVE_CACHE_FILE), exist_ok=True)
+        with open(NEGATIVE_CACHE_FILE, 'w') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+
 def check_python_packages():
-    """Check if required Python packages are installed."""
+    """Check if required Python packages are installed.
+    
+    Packages are located with importlib.util.find_spec, which doesn't run
+    them, so heavy ML libraries aren't imported just to be checked.
+    Packages found missing in the last NEGATIVE_CACHE_TTL seconds are
+    reported from the negative cache without walking sys.path again.
+    """
     packages = [
         'fastapi', 'uvicorn', 'chromadb', 'sentence_transformers',
-        'numpy', 'sklearn', 'umap', 'pydantic', 'apscheduler', 'pytest'
+        'numpy', 'scipy', 'sklearn', 'umap', 'orjson', 'pydantic', 'pytest'
     ]
     
+    now = time.time()
+    negative_cache = load_negative_cache()
+    cached_missing = {
+        package for package in packages
+        if now - negative_cache.get(package, 0) < NEGATIVE_CACHE_TTL
+    }
+    to_probe = [package for package in packages if package not in cached_missing]
+    
+    found = {package: importlib.util.find_spec(package) for package in to_probe}
+    
     all_installed = True
     for package in packages:
-        try:
-            __import__(package)
+        if found.get(package) is not None:
             print(f"  ✅ {package}")
-        except ImportError:
-            print(f"  ❌ {package} - NOT INSTALLED")
+            negative_cache.pop(package, None)
+        else:
+            distribution = DISTRIBUTION_NAMES.get(package, package)
+            cached = " (cached)" if package in cached_missing else ""
+            print(f"  ❌ {package} - NOT INSTALLED{cached} (pip install {distribution})")
+            if package not in cached_missing:
+                negative_cache[package] = now
             all_installed = False
     
+    save_negative_cache(negative_cache)
+    
     return all_installed
 
 def main():
-    """Run verification checks."""
+    """Run verification checks.
+    
+    Returns:
+        True if all core files and Python packages are present
+    """
+    # Buffer output and write it a section at a time rather than per line
+    sys.stdout.reconfigure(line_buffering=False)
+    
     print_header("TraceMind Installation Verification")
     
     # Check project structure
     print_header("Project Structure")
     
-    checks = [
-        ("backend/app/main.py", "Backend main application"),
-        ("backend/app/api/routes.py", "API routes"),
-        ("backend/app/services/embeddings.py", "Embeddings service"),
-        ("backend/app/services/chroma_client.py", "ChromaDB client"),
-        ("backend/app/services/compaction.py", "Compaction service"),
-        ("backend/requirements.txt", "Python requirements"),
-        ("frontend/package.json", "Frontend package.json"),
-        ("frontend/src/App.jsx", "Frontend App component"),
-        ("frontend/src/pages/Remember.jsx", "Remember page"),
-        ("frontend/src/pages/Recall.jsx", "Recall page"),
-        ("frontend/src/pages/Dashboard.jsx", "Dashboard page"),
-        ("scripts/populate_demo.py", "Demo script"),
-        ("docker-compose.yml", "Docker Compose config"),
-        ("README.md", "README documentation"),
-    ]
+    structure_ok = all([check_file(path, desc) for path, desc in STRUCTURE_CHECKS])
     
-    structure_ok = all(check_file(path, desc) for path, desc in checks)
+    # Docker Compose is optional: the backend and frontend also run directly
+    if "docker-compose.yml" in list_directory("."):
+        print("  ✅ Docker Compose config")
+    else:
+        print("  ⚠️  Docker Compose config not found (optional)")
     
     # Check Python packages
     print_header("Python Packages")
@@ -69,7 +160,7 @@ def main():
     
     # Check Node modules (if installed)
     print_header("Frontend Dependencies")
-    if Path("frontend/node_modules").exists():
+    if check_directory("frontend/node_modules"):
         print("  ✅ node_modules installed")
         node_ok = True
     else:
@@ -102,6 +193,8 @@ def main():
             print("     - Run: cd frontend && npm install")
     
     print()
+    sys.stdout.flush()
+    return structure_ok and packages_ok
 
 if __name__ == "__main__":
     main()